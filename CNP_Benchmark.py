@@ -0,0 +1,195 @@
+import argparse
+import datetime
+import json
+import platform
+import random
+import resource
+import sys
+import time
+from multiprocessing import Pool
+
+from Laborator_CNP import (CompactHashTable, HashTable, HASH_STRATEGIES, ProbeCounter, generate_cnp,
+                           next_prime)
+
+
+# Benchmark reproductibil pentru tabelele CNP. Fiecare combinație
+# (mărime, motor, funcție de hash) rulează într-un proces nou, ca RSS-ul de vârf
+# să fie al configurației respective; rezultatele se scriu într-un JSON.
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+DEFAULT_ENGINES = ["dict", "chained", "compact"]
+# ord_sum și digit_sum au doar câteva sute de valori distincte: la 1M de chei
+# o căutare parcurge mii de intrări, deci se rulează doar la cerere.
+DEFAULT_HASHES = ["multiplicative", "fnv1a", "siphash", "cnp_fields"]
+
+
+def peak_rss():
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def generate_keys(size, lookups, seed):
+    try:
+        import numpy as np
+        from Laborator_CNP import generate_cnp_block
+
+        rng = np.random.default_rng(seed)
+        keys = list(dict.fromkeys(map(str, generate_cnp_block(rng, size).tolist())))
+    except ImportError:
+        random.seed(seed)
+        keys = list(dict.fromkeys(generate_cnp() for _ in range(size)))
+    rng = random.Random(seed)
+    hits = [rng.choice(keys) for _ in range(lookups)]
+    # Generatorul folosește doar cifrele de sex 1 și 2, deci aceleași CNP-uri
+    # cu prima cifră 9 au format valid și sigur lipsesc din tabel.
+    misses = ["9" + key[1:] for key in rng.sample(keys, min(lookups, len(keys)))]
+    return keys, hits, misses
+
+
+def build_table(engine, hash_name, size):
+    if engine == "dict":
+        return {}
+    if engine == "chained":
+        return HashTable(next_prime(max(size, 11)), hash_name)
+    if engine == "compact":
+        return CompactHashTable(int(size / 0.7) + 1)
+    raise ValueError(f"Motor necunoscut: {engine!r}")
+
+
+def structure_bytes(table):
+
+    # Memoria structurii în sine, fără șirurile cheilor și valorilor (aceleași
+    # pentru toate motoarele). Delta de RSS nu e de încredere aici, pentru că
+    # alocatorul refolosește memoria eliberată după generarea cheilor.
+    if isinstance(table, dict):
+        return sys.getsizeof(table)
+    if isinstance(table, HashTable):
+        total = sys.getsizeof(table.table) + sum(sys.getsizeof(segment) for segment in table.table if segment)
+        for bucket in table.buckets():
+            if bucket:
+                total += sys.getsizeof(bucket) + sum(sys.getsizeof(entry) for entry in bucket)
+        return total
+    return table.memory_usage()
+
+
+def time_lookups(table, keys):
+    search = table.get if isinstance(table, dict) else table.search
+    start = time.perf_counter_ns()
+    for key in keys:
+        search(key)
+    return (time.perf_counter_ns() - start) / len(keys) if keys else 0.0
+
+
+def count_probes(table, keys):
+    table.probes = ProbeCounter()
+    for key in keys:
+        table.search(key)
+    probes, table.probes = table.probes, None
+    return probes
+
+
+def run_case(case):
+    size, engine, hash_name, lookups, seed = case
+    keys, hits, misses = generate_keys(size, lookups, seed)
+
+    table = build_table(engine, hash_name, size)
+    start = time.perf_counter()
+    if engine == "dict":
+        for key in keys:
+            table.setdefault(key, "Prenume Nume")
+    else:
+        for key in keys:
+            table.insert(key, "Prenume Nume")
+    build_seconds = time.perf_counter() - start
+
+    result = {
+        "size": size,
+        "entries": len(keys),
+        "engine": engine,
+        "hash": hash_name,
+        "build_seconds": build_seconds,
+        "bytes_per_entry": structure_bytes(table) / len(keys),
+    }
+
+    result["hit_ns"] = time_lookups(table, hits)
+    result["miss_ns"] = time_lookups(table, misses)
+
+    if engine != "dict":
+        stats = table.stats()
+        result["max_chain"] = stats["max_chain"]
+        result["mean_chain"] = stats["mean_chain"]
+        result["chain_histogram"] = {str(k): v for k, v in stats["chain_histogram"].items()}
+        # Sondările se numără într-o trecere separată, ca evidența lor să nu intre în timpii de mai sus.
+        result["hit_probes"] = {str(k): v for k, v in count_probes(table, hits).histogram.items()}
+        result["miss_probes"] = {str(k): v for k, v in count_probes(table, misses).histogram.items()}
+    if hasattr(table, "search_many"):
+        try:
+            start = time.perf_counter_ns()
+            table.search_many(hits)
+            result["batch_hit_ns"] = (time.perf_counter_ns() - start) / len(hits)
+        except ImportError:
+            pass
+    result["peak_rss_bytes"] = peak_rss()
+    return result
+
+
+def build_cases(sizes, engines, hashes, lookups, seed):
+    cases = []
+    for size in sizes:
+        for engine in engines:
+            for hash_name in (hashes if engine == "chained" else ["builtin" if engine == "dict" else "fibonacci"]):
+                cases.append((size, engine, hash_name, lookups, seed))
+    return cases
+
+
+def run_benchmark(sizes=None, engines=None, hashes=None, lookups=100_000, seed=0, output="cnp_benchmark.json"):
+    cases = build_cases(sizes or DEFAULT_SIZES, engines or DEFAULT_ENGINES, hashes or DEFAULT_HASHES, lookups, seed)
+    results = []
+    # maxtasksperchild=1: fiecare caz într-un proces nou, deci ru_maxrss nu
+    # moștenește vârful cazului anterior.
+    with Pool(1, maxtasksperchild=1) as pool:
+        for case in cases:
+            result = pool.apply(run_case, (case,))
+            results.append(result)
+            print(f"{result['engine']:>8} {result['hash']:>14} n={result['entries']:>9}: "
+                  f"build {result['build_seconds']:.2f} s, hit {result['hit_ns']:.0f} ns, "
+                  f"miss {result['miss_ns']:.0f} ns, {result['bytes_per_entry']:.1f} B/intrare, "
+                  f"RSS vârf {result['peak_rss_bytes'] / 2 ** 20:.0f} MiB")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": sys.version,
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "seed": seed,
+            "lookups": lookups,
+        },
+        "results": results,
+    }
+    with open(output, mode="w") as f:
+        json.dump(report, f, indent=4)
+    print(f"\nRezultatele au fost scrise în {output}.")
+    return report
+
+
+def parse_list(value, cast=str):
+
+    return [cast(item) for item in value.split(",") if item]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pentru tabelele de hash CNP.")
+    parser.add_argument("--sizes", type=lambda v: parse_list(v, int), default=DEFAULT_SIZES)
+    parser.add_argument("--engines", type=parse_list, default=DEFAULT_ENGINES)
+    parser.add_argument("--hashes", type=parse_list, default=DEFAULT_HASHES,
+                        help=f"disponibile: {', '.join(HASH_STRATEGIES)}")
+    parser.add_argument("--lookups", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="cnp_benchmark.json")
+    args = parser.parse_args()
+    run_benchmark(args.sizes, args.engines, args.hashes, args.lookups, args.seed, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,254 @@
+import argparse
+import json
+import platform
+import random
+import sys
+import threading
+import time
+
+from CNP_Benchmark import generate_keys
+from Laborator_CNP import EMPTY_BUCKET, ProbeCounter, bucket_stats, next_prime, resolve_hash_strategy
+
+
+# Variantă concurentă a lui HashTable. Scrierile iau lacătul benzii (stripe)
+# cheii, iar citirile nu iau niciun lacăt: un bucket este un tuplu imuabil,
+# înlocuit cu unul nou la fiecare inserare, iar (table, size) se publică
+# împreună ca un singur tuplu, deci un cititor vede fie starea veche, fie pe
+# cea nouă, niciodată una pe jumătate. Mărimea tabelului este mereu multiplu
+# de numărul de benzi, deci banda unei chei (h % stripes) nu se schimbă la
+# redimensionare. Nu depinde de GIL: merge la fel pe build-urile free-threaded.
+class ConcurrentHashTable:
+    def __init__(self, size=1000003, hash_strategy="multiplicative", max_load=1.0, stripes=64, track_probes=False):
+        self.stripes = stripes
+        self.track_probes = track_probes
+        self.hash_strategy = resolve_hash_strategy(hash_strategy)
+        self.max_load = max_load
+        self.locks = [threading.Lock() for _ in range(stripes)]
+        self.counts = [0] * stripes
+        self._resize_lock = threading.Lock()
+        self._local = threading.local()
+        self._counters = []
+        self._counters_lock = threading.Lock()
+        self.resizes = 0
+        size = self._stripe_multiple(size)
+        self._state = ([EMPTY_BUCKET] * size, size)
+
+    def _stripe_multiple(self, size):
+
+        # stripes * prim: multiplu de stripes, dar cu un factor prim mare, ca
+        # și funcțiile de hash slabe să se împrăștie pe toate bucket-urile.
+        return self.stripes * next_prime(max(2, -(-size // self.stripes)))
+
+    @property
+    def size(self):
+        return self._state[1]
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    @property
+    def probes(self):
+        # Un ProbeCounter per fir (fără contenție la căutare), adunate la citire.
+        total = ProbeCounter()
+        with self._counters_lock:
+            for counter in self._counters:
+                total.merge(counter)
+        return total
+
+    def _probe_counter(self):
+        counter = getattr(self._local, "probes", None)
+        if counter is None:
+            counter = self._local.probes = ProbeCounter()
+            with self._counters_lock:
+                self._counters.append(counter)
+        return counter
+
+    def insert(self, key, value):
+        h = self.hash_strategy(key)
+        stripe = h % self.stripes
+        lock = self.locks[stripe]
+        while True:
+            state = self._state
+            with lock:
+                if self._state is not state:
+                    # O redimensionare a publicat un tabel nou între timp.
+                    continue
+                table, size = state
+                index = h % size
+                table[index] = table[index] + ((key, value),)
+                self.counts[stripe] += 1
+            break
+        if self.max_load and self.counts[stripe] * self.stripes > size * self.max_load:
+            self._resize(size)
+
+    def _resize(self, seen_size):
+        with self._resize_lock:
+            table, size = self._state
+            if size != seen_size or self.count <= size * self.max_load:
+                return
+            # Toate benzile, mereu în aceeași ordine: niciun scriitor nu mai
+            # modifică tabelul vechi cât timp este copiat.
+            for lock in self.locks:
+                lock.acquire()
+            try:
+                new_size = self._stripe_multiple(2 * size + 1)
+                new_table = [EMPTY_BUCKET] * new_size
+                for bucket in table:
+                    for entry in bucket:
+                        index = self.hash_strategy(entry[0]) % new_size
+                        new_table[index] = new_table[index] + (entry,)
+                self._state = (new_table, new_size)
+                self.resizes += 1
+            finally:
+                for lock in reversed(self.locks):
+                    lock.release()
+
+    def search(self, key):
+        table, size = self._state
+        iterations = 0
+        for entry in table[self.hash_strategy(key) % size]:
+            iterations += 1
+            if entry[0] == key:
+                if self.track_probes:
+                    self._probe_counter().record(iterations)
+                return entry[1], iterations
+        if self.track_probes:
+            self._probe_counter().record(iterations)
+        return None, iterations
+
+    def stats(self):
+        stats = bucket_stats(self._state[0])
+        stats["hash_strategy"] = self.hash_strategy.__name__
+        stats["stripes"] = self.stripes
+        stats["resizes"] = self.resizes
+        if self.track_probes:
+            stats.update(self.probes.as_dict())
+        return stats
+
+
+# Test de stres și benchmark pentru ConcurrentHashTable: fire de citire caută
+# în buclă CNP-uri încărcate dinainte, întâi singure, apoi în timp ce fire de
+# scriere inserează restul cheilor (tabelul pornește mic, deci se redimensionează
+# de mai multe ori sub citiri). Orice CNP preîncărcat negăsit este o eroare.
+def gil_enabled():
+
+    # sys._is_gil_enabled există doar de la 3.13; înainte GIL-ul e mereu activ.
+    return getattr(sys, "_is_gil_enabled", lambda: True)()
+
+
+def reader(table, keys, seed, stop, barrier, results):
+    rng = random.Random(seed)
+    sample = [rng.choice(keys) for _ in range(4096)]
+    search = table.search
+    reads = missing = 0
+    barrier.wait()
+    while not stop.is_set():
+        for key in sample:
+            if search(key)[0] is None:
+                missing += 1
+        reads += len(sample)
+    results.append((reads, missing))
+
+
+def writer(table, keys, barrier, results):
+    barrier.wait()
+    start = time.perf_counter()
+    for key in keys:
+        table.insert(key, "Prenume Nume")
+    results.append(time.perf_counter() - start)
+
+
+def run_phase(table, preloaded, readers, duration, pending=(), writers=0, seed=0):
+    stop = threading.Event()
+    read_results = []
+    write_results = []
+    chunks = [pending[i::writers] for i in range(writers)]
+    barrier = threading.Barrier(readers + writers + 1)
+    threads = [threading.Thread(target=reader, args=(table, preloaded, seed + i, stop, barrier, read_results))
+               for i in range(readers)]
+    threads += [threading.Thread(target=writer, args=(table, chunk, barrier, write_results)) for chunk in chunks]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    # Citirile durează cel puțin cât scrierile, ca toate inserările să aibă loc sub citiri.
+    while time.perf_counter() - start < duration or len(write_results) < writers:
+        time.sleep(0.01)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    reads = sum(r for r, _ in read_results)
+    return {
+        "readers": readers,
+        "writers": writers,
+        "seconds": elapsed,
+        "reads": reads,
+        "reads_per_second": reads / elapsed,
+        "missing_reads": sum(m for _, m in read_results),
+        "inserts": len(pending),
+        "inserts_per_second": len(pending) / max(write_results) if write_results else 0.0,
+    }
+
+
+def run_stress(preload=200_000, inserts=800_000, readers=4, writers=2, duration=2.0, stripes=64, seed=0):
+    keys, _, _ = generate_keys(preload + inserts, 0, seed)
+    preloaded, pending = keys[:preload], keys[preload:]
+    table = ConcurrentHashTable(preload, stripes=stripes)
+    for key in preloaded:
+        table.insert(key, "Prenume Nume")
+
+    read_only = run_phase(table, preloaded, readers, duration, seed=seed)
+    print(f"Doar citiri ({readers} fire): {read_only['reads_per_second']:,.0f} căutări/s")
+    resizes = table.resizes
+    mixed = run_phase(table, preloaded, readers, duration, pending, writers, seed=seed)
+    print(f"Citiri sub {writers} fire de scriere: {mixed['reads_per_second']:,.0f} căutări/s, "
+          f"{mixed['inserts_per_second']:,.0f} inserări/s, {table.resizes - resizes} redimensionări")
+
+    # După scrieri, fiecare cheie trebuie găsită exact o dată.
+    lost = sum(1 for key in keys if table.search(key)[0] is None)
+    errors = read_only["missing_reads"] + mixed["missing_reads"] + lost + abs(table.count - len(keys))
+    print(f"Chei pierdute: {lost}, citiri ratate: {read_only['missing_reads'] + mixed['missing_reads']}, "
+          f"intrări {table.count}/{len(keys)} -> {'OK' if not errors else 'EȘEC'}")
+    return {
+        "meta": {
+            "python": sys.version,
+            "implementation": platform.python_implementation(),
+            "gil_enabled": gil_enabled(),
+            "stripes": stripes,
+            "seed": seed,
+        },
+        "read_only": read_only,
+        "mixed": mixed,
+        "lost_keys": lost,
+        "final_size": table.size,
+        "resizes": table.resizes,
+        "ok": not errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de stres pentru ConcurrentHashTable.")
+    parser.add_argument("--preload", type=int, default=200_000)
+    parser.add_argument("--inserts", type=int, default=800_000)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--duration", type=float, default=2.0)
+    parser.add_argument("--stripes", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="scrie raportul JSON în acest fișier")
+    args = parser.parse_args()
+
+    print(f"GIL {'activ' if gil_enabled() else 'dezactivat (free-threaded)'}")
+    report = run_stress(args.preload, args.inserts, args.readers, args.writers, args.duration, args.stripes,
+                        args.seed)
+    if args.output:
+        with open(args.output, mode="w") as f:
+            json.dump(report, f, indent=4)
+    sys.exit(0 if report["ok"] else 1)
+
+
+if __name__ == '__main__':
+    main()
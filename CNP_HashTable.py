@@ -0,0 +1,21 @@
+from Laborator_CNP import HashTable as ChainedHashTable
+
+
+# Tabelul folosit de pipeline-ul din HashTable.py, într-un modul separat ca să
+# poată fi importat (și deci încărcat din cache) oricum ar fi pornit pipeline-ul.
+class HashTable(ChainedHashTable):
+    """Separate-chaining hash table keyed by CNP.
+
+    Shares the implementation of Laborator_CNP.HashTable, so it grows with incremental
+    rehashing once the load factor passes max_load instead of keeping a fixed capacity.
+    With bloom_fp_rate set, a Bloom filter rejects most absent CNPs before any bucket is read.
+    With encode_values, names are stored once and buckets hold small name ids (see find_by_name)."""
+    def __init__(self, capacity, hash_strategy="digit_sum", max_load=1.0, rehash_step=4, bloom_fp_rate=None,
+                 encode_values=False):
+        super().__init__(capacity, hash_strategy, max_load, rehash_step, bloom_fp_rate,
+                         encode_values=encode_values)
+
+    @property
+    def capacity(self):
+        """Current number of buckets (changes when the table grows)."""
+        return self.size
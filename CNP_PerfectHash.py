@@ -0,0 +1,231 @@
+import struct
+import sys
+from array import array
+
+import numpy as np
+
+from Laborator_CNP import (CompactHashTable, EMPTY_SLOT, MASK64, ProbeCounter, cnp_to_int, mix64,
+                           populate_hash_table)
+
+
+# Index "înghețat" pentru setul de CNP-uri care nu se mai schimbă: o funcție
+# de hash perfectă minimală în stilul BBHash. Pe fiecare nivel cheile rămase
+# sunt hash-uite într-un vector de biți de ~gamma * n poziții; cheile care cad
+# singure pe o poziție își marchează bitul, celelalte trec la nivelul următor.
+# Slotul unei chei este rangul (numărul de biți setați înaintea) bitului ei,
+# deci sloturile sunt exact 0..n-1 și orice căutare atinge un singur slot.
+MPH_MAGIC = b"CNPMPH01"
+MPH_HEADER = struct.Struct("<8sIIQQQQ")
+MAX_LEVELS = 32
+SUPERBLOCK_BITS = 512
+LEVEL_SEED_MULTIPLIER = 0xD6E8FEB86659FD93
+
+
+def level_seed(level):
+
+    return ((level + 1) * LEVEL_SEED_MULTIPLIER) & MASK64
+
+
+def mix64_array(h):
+
+    # Aceeași funcție ca Laborator_CNP.mix64, pe uint64 (înmulțirile trec peste 2^64).
+    h = (h ^ (h >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    h = (h ^ (h >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return h ^ (h >> np.uint64(31))
+
+
+class PerfectHashIndex:
+    def __init__(self, levels, words, superblocks, fallback, slot_keys, slot_values, value_list, track_probes=False):
+        self.levels = levels
+        self.words = words
+        self.superblocks = superblocks
+        self.fallback = fallback
+        self.slot_keys = slot_keys
+        self.slot_values = slot_values
+        self.value_list = value_list
+        self.count = len(slot_keys)
+        self.probes = ProbeCounter() if track_probes else None
+
+    def _rank(self, pos):
+        words = self.words
+        rank = self.superblocks[pos // SUPERBLOCK_BITS]
+        for w in range(pos // SUPERBLOCK_BITS * (SUPERBLOCK_BITS // 64), pos >> 6):
+            rank += words[w].bit_count()
+        return rank + (words[pos >> 6] & ((1 << (pos & 63)) - 1)).bit_count()
+
+    def slot(self, packed):
+        words = self.words
+        for seed, size, offset in self.levels:
+            pos = offset + mix64(packed ^ seed) % size
+            if words[pos >> 6] >> (pos & 63) & 1:
+                return self._rank(pos)
+        return self.fallback.get(packed)
+
+    def search(self, key):
+        # Mereu o singură iterație: funcția dă direct slotul, iar cheia stocată
+        # acolo confirmă sau infirmă potrivirea.
+        try:
+            packed = cnp_to_int(key)
+        except ValueError:
+            if self.probes is not None:
+                self.probes.record(1)
+            return None, 1
+        index = self.slot(packed)
+        if self.probes is not None:
+            self.probes.record(1)
+        if index is not None and self.slot_keys[index] == packed:
+            return self.value_list[self.slot_values[index]], 1
+        return None, 1
+
+    def bits_per_key(self):
+        overhead = 64 * len(self.words) + 32 * len(self.superblocks) + 128 * len(self.fallback)
+        return overhead / self.count if self.count else 0.0
+
+    def stats(self):
+        stats = {
+            "entries": self.count,
+            "levels": len(self.levels),
+            "fallback_keys": len(self.fallback),
+            "bits_per_key": self.bits_per_key(),
+        }
+        if self.probes is not None:
+            stats.update(self.probes.as_dict())
+        return stats
+
+    def save(self, filename):
+        heap = bytearray()
+        offsets = array('I', [0])
+        for value in self.value_list:
+            heap += value.encode("utf-8")
+            offsets.append(len(heap))
+        level_table = array('Q', [x for level in self.levels for x in level])
+        fallback = array('Q', [x for item in sorted(self.fallback.items()) for x in item])
+        arrays = [level_table, self.words, self.superblocks, fallback, self.slot_keys, self.slot_values, offsets]
+        if sys.byteorder != "little":
+            arrays = [array(a.typecode, a) for a in arrays]
+            for a in arrays:
+                a.byteswap()
+
+        with open(filename, mode="wb") as f:
+            f.write(MPH_HEADER.pack(MPH_MAGIC, 1, len(self.levels), len(self.words), len(self.superblocks),
+                                    len(self.fallback), self.count))
+            f.write(struct.pack("<QQ", len(self.value_list), len(heap)))
+            for a in arrays:
+                a.tofile(f)
+            f.write(heap)
+
+    @classmethod
+    def load(cls, filename):
+        with open(filename, mode="rb") as f:
+            magic, version, levels, words, superblocks, fallback, count = MPH_HEADER.unpack(
+                f.read(MPH_HEADER.size))
+            if magic != MPH_MAGIC or version != 1:
+                raise ValueError(f"{filename} nu este un index perfect CNP valid.")
+            values, heap_length = struct.unpack("<QQ", f.read(16))
+            sizes = [('Q', 3 * levels), ('Q', words), ('I', superblocks), ('Q', 2 * fallback), ('Q', count),
+                     ('I', count), ('I', values + 1)]
+            arrays = []
+            for typecode, n in sizes:
+                a = array(typecode)
+                a.fromfile(f, n)
+                if sys.byteorder != "little":
+                    a.byteswap()
+                arrays.append(a)
+            heap = f.read(heap_length)
+        level_table, word_array, superblock_array, fallback_pairs, slot_keys, slot_values, offsets = arrays
+        value_list = [heap[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(values)]
+        level_list = [tuple(level_table[i:i + 3]) for i in range(0, len(level_table), 3)]
+        fallback_map = dict(zip(fallback_pairs[0::2], fallback_pairs[1::2]))
+        return cls(level_list, word_array, superblock_array, fallback_map, slot_keys, slot_values, value_list)
+
+
+def table_items(table):
+
+    # (cheie împachetată, valoare) pentru fiecare CNP distinct, cu prima
+    # înregistrare inserată câștigătoare, ca în search.
+    if isinstance(table, CompactHashTable):
+        for packed, vid in zip(table.keys, table.values):
+            if packed != EMPTY_SLOT:
+                yield packed, table.value_list[vid]
+        return
+    seen = set()
+    for bucket in table.buckets():
+        for key, value in bucket or ():
+            packed = cnp_to_int(key)
+            if packed not in seen:
+                seen.add(packed)
+                yield packed, value if table.names is None else table.names.names[value]
+
+
+def freeze(table, gamma=1.0):
+    value_ids = {}
+    value_list = []
+    keys = array('Q')
+    vids = array('I')
+    for packed, value in table_items(table):
+        vid = value_ids.get(value)
+        if vid is None:
+            vid = value_ids[value] = len(value_list)
+            value_list.append(value)
+        keys.append(packed)
+        vids.append(vid)
+
+    all_keys = np.frombuffer(keys, dtype=np.uint64)
+    remaining = np.arange(len(all_keys))
+    positions = np.full(len(all_keys), -1, dtype=np.int64)
+    levels = []
+    level_bits = []
+    offset = 0
+    for level in range(MAX_LEVELS):
+        if not remaining.size:
+            break
+        size = max(64, -(-int(gamma * remaining.size) // 64) * 64)
+        seed = level_seed(level)
+        pos = (mix64_array(all_keys[remaining] ^ np.uint64(seed)) % np.uint64(size)).astype(np.int64)
+        alone = np.bincount(pos, minlength=size)[pos] == 1
+        bits = np.zeros(size, dtype=bool)
+        bits[pos[alone]] = True
+        positions[remaining[alone]] = offset + pos[alone]
+        levels.append((seed, size, offset))
+        level_bits.append(bits)
+        remaining = remaining[~alone]
+        offset += size
+
+    bits = np.concatenate(level_bits) if level_bits else np.zeros(0, dtype=bool)
+    # Rangul fiecărui bit setat = sloturile 0..k-1; cheile rămase după ultimul
+    # nivel (foarte puține) primesc sloturile de după, printr-un dicționar.
+    rank = np.cumsum(bits, dtype=np.int64) - 1
+    slots = np.empty(len(all_keys), dtype=np.int64)
+    placed = positions >= 0
+    slots[placed] = rank[positions[placed]]
+    ranked = int(bits.sum())
+    slots[remaining] = ranked + np.arange(remaining.size)
+    fallback = {int(all_keys[i]): ranked + j for j, i in enumerate(remaining.tolist())}
+
+    # Fiecare nivel are un multiplu de 64 de poziții, deci biții se împart
+    # exact în cuvinte; superblocurile rețin rangul la fiecare 512 biți.
+    words = array('Q', np.packbits(bits, bitorder="little").tobytes())
+    word_counts = bits.reshape(-1, 64).sum(axis=1)
+    cumulative = np.concatenate(([0], np.cumsum(word_counts)))
+    superblocks = array('I', cumulative[:len(words):SUPERBLOCK_BITS // 64].astype(np.uint32).tobytes())
+
+    slot_keys = np.zeros(len(all_keys), dtype=np.uint64)
+    slot_values = np.zeros(len(all_keys), dtype=np.uint32)
+    slot_keys[slots] = all_keys
+    slot_values[slots] = np.frombuffer(vids, dtype=np.uint32)
+    index = PerfectHashIndex(levels, words, superblocks, fallback, array('Q', slot_keys.tobytes()),
+                             array('I', slot_values.tobytes()), value_list)
+    print(f"\nIndex perfect construit: {index.count} chei, {len(levels)} niveluri, "
+          f"{index.bits_per_key():.2f} biți/cheie.")
+    return index
+
+
+def main():
+    ht = populate_hash_table("cnp_data.csv", table_cls=CompactHashTable)
+    index = freeze(ht)
+    index.save("cnp_data.mph")
+    print("Indexul a fost salvat în cnp_data.mph.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,256 @@
+import argparse
+import asyncio
+import os
+import random
+import socket
+import statistics
+import time
+from multiprocessing import Process
+
+from Laborator_CNP import MmapCNPIndex, build_mmap_index, generate_data_csv, index_matches_source, sample_keys
+
+
+# Protocol pe linii (UTF-8, terminate cu "\n"):
+#   <cnp>                 -> "<cnp>\t<nume sau ->\t<iterații>"
+#   MGET <cnp> <cnp> ...  -> "<n>" urmat de n linii ca mai sus, în aceeași ordine
+#   PING                  -> "PONG"
+#   QUIT                  -> închide conexiunea
+# Cererile pot fi trimise în pipeline: răspunsurile vin în ordinea cererilor.
+# O linie mai lungă decât MAX_REQUEST_BYTES primește "ERR ..." și este ignorată.
+NOT_FOUND = "-"
+# Limita StreamReader-ului: ajunge pentru un MGET cu peste 1M de CNP-uri (14 octeți fiecare).
+MAX_REQUEST_BYTES = 16 * 1024 * 1024
+
+
+def format_result(cnp, name, iterations):
+
+    return f"{cnp}\t{name if name is not None else NOT_FOUND}\t{iterations}\n"
+
+
+async def read_request(reader):
+    # Întoarce următoarea linie (b"" la sfârșitul conexiunii) sau None dacă
+    # linia depășea limita; în acest caz restul ei e citit și aruncat, ca
+    # următoarea cerere din pipeline să fie citită de la început.
+    try:
+        return await reader.readuntil(b"\n")
+    except asyncio.IncompleteReadError as e:
+        return e.partial
+    except asyncio.LimitOverrunError as e:
+        consumed = e.consumed
+    while True:
+        await reader.readexactly(consumed)
+        try:
+            await reader.readuntil(b"\n")
+            return None
+        except asyncio.IncompleteReadError:
+            return None
+        except asyncio.LimitOverrunError as e:
+            consumed = e.consumed
+
+
+def open_index(csv_filename="cnp_data.csv", index_filename="cnp_data.idx", total_records=1_000_000):
+    if not os.path.exists(csv_filename):
+        print("Generare fișier CSV...")
+        generate_data_csv(csv_filename, total_records)
+    if not index_matches_source(index_filename, csv_filename):
+        build_mmap_index(csv_filename, index_filename)
+    return MmapCNPIndex(index_filename)
+
+
+class LookupServer:
+    def __init__(self, index):
+        self.index = index
+        self.requests = 0
+        self.keys_resolved = 0
+
+    def handle_line(self, line):
+        parts = line.split()
+        if not parts:
+            return ""
+        command = parts[0].upper()
+        if command == "PING":
+            return "PONG\n"
+        if command == "MGET":
+            keys = parts[1:]
+            if not keys:
+                return "0\n"
+            values, _, iterations = self.index.search_many(keys)
+            self.keys_resolved += len(keys)
+            return f"{len(keys)}\n" + "".join(map(format_result, keys, values, iterations.tolist()))
+        if len(parts) != 1:
+            return f"ERR comandă necunoscută: {parts[0]}\n"
+        name, iterations = self.index.search(parts[0])
+        self.keys_resolved += 1
+        return format_result(parts[0], name, iterations)
+
+    async def handle_client(self, reader, writer):
+        try:
+            while True:
+                line = await read_request(reader)
+                if line is None:
+                    writer.write(f"ERR cerere mai lungă de {MAX_REQUEST_BYTES} octeți\n".encode("utf-8"))
+                    await writer.drain()
+                    continue
+                if not line:
+                    break
+                line = line.decode("utf-8", errors="replace")
+                if line.strip().upper() == "QUIT":
+                    break
+                self.requests += 1
+                writer.write(self.handle_line(line).encode("utf-8"))
+                # drain() blochează doar peste limita buffer-ului, deci cererile
+                # din pipeline sunt procesate fără să aștepte fiecare scriere.
+                await writer.drain()
+        except ConnectionResetError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=7070, unix_path=None, reuse_port=False):
+        if unix_path:
+            if os.path.exists(unix_path):
+                os.remove(unix_path)
+            server = await asyncio.start_unix_server(self.handle_client, path=unix_path, limit=MAX_REQUEST_BYTES)
+            where = unix_path
+        else:
+            server = await asyncio.start_server(self.handle_client, host, port, reuse_port=reuse_port,
+                                                limit=MAX_REQUEST_BYTES)
+            where = f"{host}:{port}"
+        print(f"Serviciul de căutare CNP ascultă pe {where} (pid {os.getpid()}).")
+        async with server:
+            await server.serve_forever()
+
+
+def _serve_worker(index_filename, host, port):
+    with MmapCNPIndex(index_filename) as index:
+        asyncio.run(LookupServer(index).serve(host, port, reuse_port=True))
+
+
+def run_server(csv_filename="cnp_data.csv", index_filename="cnp_data.idx", host="127.0.0.1", port=7070,
+               unix_path=None, workers=1):
+    # Indexul este mapat read-only, deci toate procesele worker împart
+    # aceleași pagini din page cache; pe TCP, SO_REUSEPORT distribuie conexiunile.
+    index = open_index(csv_filename, index_filename)
+    if workers <= 1 or unix_path:
+        try:
+            asyncio.run(LookupServer(index).serve(host, port, unix_path))
+        finally:
+            index.close()
+        return
+
+    index.close()
+    processes = [Process(target=_serve_worker, args=(index_filename, host, port)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+
+
+# --- Client de încărcare ---
+
+async def _open_connection(host, port, unix_path):
+    if unix_path:
+        return await asyncio.open_unix_connection(unix_path)
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.get_extra_info("socket").setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return reader, writer
+
+
+async def _client_worker(host, port, unix_path, requests, depth, latencies):
+    reader, writer = await _open_connection(host, port, unix_path)
+    sent_at = asyncio.Queue(maxsize=depth)
+
+    async def receive():
+        for keys in requests:
+            start = await sent_at.get()
+            line = await reader.readline()
+            if len(keys) > 1:
+                for _ in range(int(line)):
+                    await reader.readline()
+            latencies.append(time.perf_counter() - start)
+
+    receiver = asyncio.create_task(receive())
+    for keys in requests:
+        request = f"MGET {' '.join(keys)}\n" if len(keys) > 1 else f"{keys[0]}\n"
+        # Coada limitează câte cereri sunt în zbor pe conexiune (adâncimea pipeline-ului).
+        await sent_at.put(time.perf_counter())
+        writer.write(request.encode("utf-8"))
+        await writer.drain()
+    await receiver
+    writer.write(b"QUIT\n")
+    writer.close()
+
+
+def percentile(sorted_values, fraction):
+
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+async def load_test(keys, host="127.0.0.1", port=7070, unix_path=None, requests=100_000, connections=8, depth=16,
+                    batch=1):
+    batches = [[random.choice(keys) for _ in range(batch)] for _ in range(requests)]
+    per_connection = [batches[i::connections] for i in range(connections)]
+    latencies = []
+
+    start = time.perf_counter()
+    await asyncio.gather(*(_client_worker(host, port, unix_path, chunk, depth, latencies)
+                           for chunk in per_connection if chunk))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    report = {
+        "requests": requests,
+        "keys": requests * batch,
+        "connections": connections,
+        "depth": depth,
+        "batch": batch,
+        "seconds": elapsed,
+        "qps": requests / elapsed,
+        "keys_per_second": requests * batch / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+    }
+    print("\n--- Rezultate test de încărcare ---")
+    print(f"Cereri: {requests} (lot {batch}, {connections} conexiuni, pipeline {depth})")
+    print(f"QPS: {report['qps']:,.0f} cereri/s ({report['keys_per_second']:,.0f} CNP-uri/s)")
+    print(f"Latență p50: {report['p50_ms']:.3f} ms, p99: {report['p99_ms']:.3f} ms")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serviciu local de căutare CNP și client de încărcare.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("serve", "bench"):
+        p = sub.add_parser(name)
+        p.add_argument("--csv", default="cnp_data.csv")
+        p.add_argument("--host", default="127.0.0.1")
+        p.add_argument("--port", type=int, default=7070)
+        p.add_argument("--unix", default=None, help="calea unui socket Unix în loc de TCP")
+    serve = sub.choices["serve"]
+    serve.add_argument("--index", default="cnp_data.idx")
+    serve.add_argument("--workers", type=int, default=1)
+    bench = sub.choices["bench"]
+    bench.add_argument("--requests", type=int, default=100_000)
+    bench.add_argument("--connections", type=int, default=8)
+    bench.add_argument("--depth", type=int, default=16)
+    bench.add_argument("--batch", type=int, default=1)
+    bench.add_argument("--sample", type=int, default=10_000, help="câte CNP-uri distincte se eșantionează din CSV")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        run_server(args.csv, args.index, args.host, args.port, args.unix, args.workers)
+    else:
+        keys = sample_keys(args.csv, args.sample)
+        asyncio.run(load_test(keys, args.host, args.port, args.unix, args.requests, args.connections, args.depth,
+                              args.batch))
+
+
+if __name__ == '__main__':
+    main()
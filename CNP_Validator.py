@@ -0,0 +1,302 @@
+import argparse
+import datetime
+import json
+import os
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from Laborator_CNP import CONTROL_WEIGHTS
+
+
+# Validator de CNP-uri pentru fișiere mari: fișierul e citit în blocuri de
+# octeți, liniile și prima coloană sunt găsite vectorizat, iar toate verificările
+# (lungime, cifre, sex/secol, dată, județ, secvență, cifră de control) se fac pe
+# matricea de cifre a blocului. Un rând poate eșua mai multe verificări.
+REASONS = ["length", "non_digit", "sex", "month", "day", "future_date", "county", "sequence", "checksum"]
+
+# Secolul după prima cifră; 0 nu este o cifră de sex validă. 7/8 (rezidenți) și
+# 9 (străini) nu codifică secolul, deci data e verificată ca 19xx.
+CENTURY = np.array([0, 1900, 1900, 1800, 1800, 2000, 2000, 1900, 1900, 1900], dtype=np.int32)
+# 01-40 județe, 41-46 sectoarele Bucureștiului, 47-48 fostele sectoare 7 și 8,
+# 51 Călărași, 52 Giurgiu.
+VALID_COUNTY = np.zeros(100, dtype=bool)
+VALID_COUNTY[1:49] = True
+VALID_COUNTY[[51, 52]] = True
+DAYS_IN_MONTH = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31], dtype=np.int32)
+
+
+def cnp_errors(cnp, today=None):
+
+    # Varianta scalară a acelorași reguli, pentru un singur CNP.
+    today = today or datetime.date.today()
+    if len(cnp) != 13:
+        return ["length"]
+    if not (cnp.isascii() and cnp.isdigit()):
+        return ["non_digit"]
+    digits = [int(ch) for ch in cnp]
+    errors = []
+    if digits[0] == 0:
+        errors.append("sex")
+    year = int(CENTURY[digits[0]]) + int(cnp[1:3])
+    month, day = int(cnp[3:5]), int(cnp[5:7])
+    if not 1 <= month <= 12:
+        errors.append("month")
+    elif digits[0] != 0:
+        # Fără o cifră de sex validă secolul (și deci anii bisecți) e necunoscut.
+        try:
+            if datetime.date(year, month, day) > today:
+                errors.append("future_date")
+        except ValueError:
+            errors.append("day")
+    if not VALID_COUNTY[int(cnp[7:9])]:
+        errors.append("county")
+    if int(cnp[9:12]) == 0:
+        errors.append("sequence")
+    control = sum(d * w for d, w in zip(digits, CONTROL_WEIGHTS)) % 11
+    if (1 if control == 10 else control) != digits[12]:
+        errors.append("checksum")
+    return errors
+
+
+def first_fields(buf):
+
+    # Începutul și sfârșitul primei coloane pentru fiecare linie din bloc
+    # (blocul se termină mereu cu "\n").
+    newlines = np.flatnonzero(buf == 10)
+    starts = np.empty(len(newlines), dtype=np.int64)
+    starts[0] = 0
+    starts[1:] = newlines[:-1] + 1
+    ends = newlines.astype(np.int64)
+    ends -= (ends > starts) & (buf[np.maximum(ends - 1, 0)] == 13)
+
+    commas = np.flatnonzero(buf == 44)
+    if len(commas) == len(starts) and (commas >= starts).all() and (commas < ends).all():
+        # Cazul obișnuit: exact o virgulă pe fiecare linie.
+        field_end = commas
+    elif len(commas):
+        k = np.minimum(np.searchsorted(commas, starts), len(commas) - 1)
+        first_comma = commas[k]
+        field_end = np.where((first_comma >= starts) & (first_comma < ends), first_comma, ends)
+    else:
+        field_end = ends
+
+    # Câmp între ghilimele: "1234567890123"
+    quoted = (field_end - starts >= 2) & (buf[starts] == 34) & (buf[np.maximum(field_end - 1, 0)] == 34)
+    field_start = starts + quoted
+    field_end = field_end - quoted
+    blank = ends == starts
+    return field_start, field_end, blank
+
+
+def validate_block(buf, today_key):
+
+    field_start, field_end, blank = first_fields(buf)
+    keep = ~blank
+    rows = np.flatnonzero(keep)
+    field_start, field_end = field_start[keep], field_end[keep]
+    failures = {}
+
+    length_ok = field_end - field_start == 13
+    failures["length"] = ~length_ok
+    # Cifrele se extrag coloană cu coloană (13 gather-uri pe uint8), fără o
+    # matrice de indici n x 13; scăderea lui "0" pe uint8 face ca orice
+    # caracter care nu e cifră să devină > 9.
+    starts = field_start[length_ok]
+    d = [buf[starts + j] - np.uint8(ord("0")) for j in range(13)]
+    digit_ok = d[0] <= 9
+    for column in d[1:]:
+        digit_ok &= column <= 9
+    failures["non_digit"] = np.zeros(len(rows), dtype=bool)
+    failures["non_digit"][length_ok] = ~digit_ok
+
+    all_checked = digit_ok.all()
+    if not all_checked:
+        d = [column[digit_ok] for column in d]
+    d = [column.astype(np.int32) for column in d]
+    sex = d[0]
+    year = CENTURY[sex] + d[1] * 10 + d[2]
+    month = d[3] * 10 + d[4]
+    day = d[5] * 10 + d[6]
+    county = d[7] * 10 + d[8]
+    sequence = d[9] * 100 + d[10] * 10 + d[11]
+
+    month_ok = (month >= 1) & (month <= 12)
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    month_days = DAYS_IN_MONTH[np.clip(month - 1, 0, 11)] + (leap & (month == 2))
+    day_ok = (day >= 1) & (day <= month_days)
+    control = d[0] * CONTROL_WEIGHTS[0]
+    for column, weight in zip(d[1:12], CONTROL_WEIGHTS[1:]):
+        control += column * weight
+    control %= 11
+    control[control == 10] = 1
+
+    date_known = month_ok & (sex != 0)
+    field_checks = {
+        "sex": sex == 0,
+        "month": ~month_ok,
+        "day": date_known & ~day_ok,
+        "future_date": date_known & day_ok & (year * 10000 + month * 100 + day > today_key),
+        "county": ~VALID_COUNTY[county],
+        "sequence": sequence == 0,
+        "checksum": control != d[12],
+    }
+    if all_checked and length_ok.all():
+        failures.update(field_checks)
+    else:
+        checked = np.flatnonzero(length_ok)[digit_ok]
+        for reason, failed in field_checks.items():
+            full = np.zeros(len(rows), dtype=bool)
+            full[checked] = failed
+            failures[reason] = full
+
+    invalid = np.zeros(len(rows), dtype=bool)
+    for failed in failures.values():
+        invalid |= failed
+    # Indicii rândurilor se raportează relativ la liniile din bloc.
+    return len(rows), {reason: rows[failed] for reason, failed in failures.items()}, rows[invalid], len(blank)
+
+
+def iter_blocks(filename, start=0, stop=None, block_size=8 << 20):
+
+    # Blocuri care se termină la un "\n"; restul se mută în blocul următor.
+    with open(filename, mode="rb") as f:
+        f.seek(start)
+        remaining = (stop if stop is not None else os.path.getsize(filename)) - start
+        carry = b""
+        while remaining > 0:
+            data = f.read(min(block_size, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            data = carry + data
+            cut = data.rfind(b"\n") + 1
+            if remaining <= 0:
+                carry = b""
+                if not data.endswith(b"\n"):
+                    data += b"\n"
+                cut = len(data)
+            else:
+                carry = data[cut:]
+            if cut:
+                yield data[:cut]
+
+
+def validate_range(task):
+    filename, start, stop, block_size, today_key, max_examples = task
+    counts = dict.fromkeys(REASONS, 0)
+    examples = {reason: [] for reason in REASONS}
+    rows = invalid = lines = 0
+    for block in iter_blocks(filename, start, stop, block_size):
+        buf = np.frombuffer(block, dtype=np.uint8)
+        block_rows, failures, invalid_rows, block_lines = validate_block(buf, today_key)
+        for reason, failed in failures.items():
+            counts[reason] += len(failed)
+            room = len(failed) if max_examples is None else max(0, max_examples - len(examples[reason]))
+            if room:
+                # Numere de linie relative la începutul intervalului, cu bază 1.
+                examples[reason].extend((failed[:room] + lines + 1).tolist())
+        rows += block_rows
+        invalid += len(invalid_rows)
+        lines += block_lines
+    return {"rows": rows, "invalid": invalid, "lines": lines, "counts": counts, "examples": examples}
+
+
+def split_ranges(filename, parts, data_start):
+
+    # Intervale de octeți aliniate la început de linie.
+    size = os.path.getsize(filename)
+    bounds = [data_start]
+    with open(filename, mode="rb") as f:
+        for i in range(1, parts):
+            f.seek(max(data_start + (size - data_start) * i // parts, bounds[-1]))
+            f.readline()
+            bounds.append(min(f.tell(), size))
+    bounds.append(size)
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if b > a]
+
+
+def validate_file(filename="cnp_data.csv", header=True, workers=1, block_size=8 << 20, max_examples=1000,
+                  today=None):
+    today = today or datetime.date.today()
+    today_key = today.year * 10000 + today.month * 100 + today.day
+    data_start = 0
+    if header:
+        with open(filename, mode="rb") as f:
+            f.readline()
+            data_start = f.tell()
+
+    start_time = time.perf_counter()
+    ranges = split_ranges(filename, max(1, workers), data_start)
+    tasks = [(filename, a, b, block_size, today_key, max_examples) for a, b in ranges]
+    if workers > 1:
+        with Pool(workers) as pool:
+            parts = pool.map(validate_range, tasks)
+    else:
+        parts = [validate_range(task) for task in tasks]
+    elapsed = time.perf_counter() - start_time
+
+    counts = dict.fromkeys(REASONS, 0)
+    examples = {reason: [] for reason in REASONS}
+    # Liniile fiecărui interval se decalează cu liniile intervalelor anterioare
+    # (plus antetul), ca să devină numere de linie din fișier.
+    line_offset = 1 if header else 0
+    rows = invalid = 0
+    for part in parts:
+        rows += part["rows"]
+        invalid += part["invalid"]
+        for reason in REASONS:
+            counts[reason] += part["counts"][reason]
+            room = None if max_examples is None else max_examples - len(examples[reason])
+            examples[reason].extend(line + line_offset for line in part["examples"][reason][:room])
+        line_offset += part["lines"]
+
+    report = {
+        "file": filename,
+        "rows": rows,
+        "valid": rows - invalid,
+        "invalid": invalid,
+        "reasons": counts,
+        "offending_lines": {reason: lines for reason, lines in examples.items() if lines},
+        "seconds": elapsed,
+        "rows_per_second": rows / elapsed if elapsed else float("inf"),
+        "workers": workers,
+    }
+    return report
+
+
+def print_report(report):
+
+    print(f"\n--- Validare {report['file']} ---")
+    print(f"Rânduri: {report['rows']} (valide: {report['valid']}, invalide: {report['invalid']})")
+    for reason, count in report["reasons"].items():
+        if count:
+            lines = report["offending_lines"].get(reason, [])
+            preview = ", ".join(map(str, lines[:10]))
+            print(f"  {reason}: {count} (linii: {preview}{', ...' if count > len(lines[:10]) else ''})")
+    print(f"Durată: {report['seconds']:.2f} s ({report['rows_per_second']:,.0f} rânduri/s, "
+          f"{report['workers']} procese)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validare în bloc a CNP-urilor dintr-un fișier CSV.")
+    parser.add_argument("filename", nargs="?", default="cnp_data.csv")
+    parser.add_argument("--no-header", action="store_true")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--block-size", type=int, default=8 << 20)
+    parser.add_argument("--max-examples", type=int, default=1000,
+                        help="câte numere de linie se păstrează per motiv (-1 = toate)")
+    parser.add_argument("--json", default=None, help="scrie raportul complet în acest fișier")
+    args = parser.parse_args()
+
+    report = validate_file(args.filename, not args.no_header, args.workers, args.block_size,
+                           None if args.max_examples < 0 else args.max_examples)
+    print_report(report)
+    if args.json:
+        with open(args.json, mode="w") as f:
+            json.dump(report, f, indent=4)
+
+
+if __name__ == '__main__':
+    main()
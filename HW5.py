@@ -1,70 +1,557 @@
-
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, stream_with_context
+import atexit
+import bisect
+import datetime
 import json
 import os
+import signal
+import sys
+import threading
+import time
+from collections import OrderedDict
 
 app = Flask(__name__)
 DATA_FILE = 'data/items.json'
+# Write-behind: changes are flushed after FLUSH_INTERVAL seconds or as soon as FLUSH_BATCH are pending.
+FLUSH_INTERVAL = float(os.environ.get('ITEMS_FLUSH_INTERVAL', 1.0))
+FLUSH_BATCH = int(os.environ.get('ITEMS_FLUSH_BATCH', 1000))
+# Durable mode: every change is appended to a journal next to the snapshot and the background
+# thread compacts the journal into items.json every COMPACT_INTERVAL seconds / COMPACT_RECORDS records.
+# ITEMS_FSYNC: 'always' (fsync per request), 'group' (one fsync per batch of concurrent requests)
+# or 'none' (written to the OS per request, no fsync: survives a process crash, not an OS crash).
+JOURNAL = os.environ.get('ITEMS_JOURNAL', '0') == '1'
+FSYNC = os.environ.get('ITEMS_FSYNC', 'group')
+GROUP_COMMIT_DELAY = float(os.environ.get('ITEMS_GROUP_COMMIT_MS', 0)) / 1000
+COMPACT_INTERVAL = float(os.environ.get('ITEMS_COMPACT_INTERVAL', 30.0))
+COMPACT_RECORDS = int(os.environ.get('ITEMS_COMPACT_RECORDS', 10000))
+# GET /items pagination: default and maximum page size, and the page size used internally when streaming.
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_CHUNK = 1000
+# Serialized response bodies kept for conditional GETs; full listings only up to BODY_CACHE_MAX_ITEMS items
+# (larger ones are streamed, see GET /items).
+BODY_CACHE_BYTES = int(os.environ.get('ITEMS_BODY_CACHE_BYTES', 32 << 20))
+BODY_CACHE_MAX_ITEMS = 10000
 
 
-def load_data():
-    if os.path.exists(DATA_FILE):
-        with open(DATA_FILE, 'r') as f:
+def load_data(path=DATA_FILE):
+    if os.path.exists(path):
+        with open(path, 'r') as f:
             return json.load(f)
     return []
 
 
-def save_data(data):
-    with open(DATA_FILE, 'w') as f:
-        json.dump(data, f, indent=4)
+def save_data(data, path=DATA_FILE):
+    # Write to a temporary file and rename it over the old one, so a crash mid-write
+    # never leaves a truncated items.json behind.
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, separators=(',', ':'))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_meta(path=DATA_FILE):
+    """Store metadata kept next to the snapshot: currently the next id to hand out."""
+    meta_path = path + '.meta'
+    if os.path.exists(meta_path):
+        with open(meta_path, 'r') as f:
+            return json.load(f)
+    return {}
+
+
+def save_meta(meta, path=DATA_FILE):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    meta_path = path + '.meta'
+    tmp_path = meta_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, meta_path)
+
+
+def read_journal(path):
+    """Yields the records of a journal; a torn last line (crash mid-append) is ignored."""
+    if not os.path.exists(path):
+        return
+    with open(path, 'r') as f:
+        for line in f:
+            if not line.endswith('\n'):
+                break
+            yield json.loads(line)
+
+
+def rotated_journals(journal_path):
+    """Paths of the journals rotated by compactions whose snapshot was not written yet, oldest first."""
+    directory = os.path.dirname(journal_path) or '.'
+    prefix = os.path.basename(journal_path) + '.old.'
+    if not os.path.isdir(directory):
+        return []
+    numbers = sorted(int(name[len(prefix):]) for name in os.listdir(directory)
+                     if name.startswith(prefix) and name[len(prefix):].isdigit())
+    return [f'{journal_path}.old.{number}' for number in numbers]
+
+
+def replay(by_id, records):
+    """Applies journal records on top of a snapshot (an id -> item dict, updated in place).
+    Puts and deletes by id are idempotent, so replaying records that the snapshot already
+    contains is harmless. Returns the highest id seen in the journal."""
+    max_id = 0
+    for record in records:
+        if record['op'] == 'put':
+            item_id = record['item']['id']
+            by_id[item_id] = record['item']
+            max_id = max(max_id, item_id)
+        elif record['op'] == 'delete':
+            by_id.pop(record['id'], None)
+    return max_id
+
+
+class BodyCache:
+    """LRU of serialized response bodies, bounded by total size. An entry is only returned for
+    the ETag it was built for, so a body built from data that changed meanwhile is never served."""
+
+    def __init__(self, max_bytes=BODY_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.collection_keys = set()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, etag):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == etag:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def put(self, key, etag, body):
+        if len(body) > self.max_bytes // 4:
+            return
+        with self.lock:
+            self._discard(key)
+            self.entries[key] = (etag, body)
+            self.size += len(body)
+            if key[0] != 'item':
+                self.collection_keys.add(key)
+            while self.size > self.max_bytes:
+                self._discard(next(iter(self.entries)))
+
+    def _discard(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[1])
+            self.collection_keys.discard(key)
+
+    def invalidate(self, item_id):
+        # A write changes one item and every listing; other items' bodies stay cached.
+        with self.lock:
+            self._discard(('item', item_id))
+            for key in list(self.collection_keys):
+                self._discard(key)
+
+
+class ItemStore:
+    """Items kept in memory by id, loaded once; a background thread writes them back to disk.
+    With journal=True every change is also appended to <path>.journal before the request
+    returns, and the thread compacts the journal into items.json instead."""
+
+    def __init__(self, path=DATA_FILE, flush_interval=FLUSH_INTERVAL, flush_batch=FLUSH_BATCH, journal=JOURNAL,
+                 fsync=FSYNC, group_commit_delay=GROUP_COMMIT_DELAY, compact_interval=COMPACT_INTERVAL,
+                 compact_records=COMPACT_RECORDS):
+        if fsync not in ('always', 'group', 'none'):
+            raise ValueError(f"fsync must be 'always', 'group' or 'none', not {fsync!r}")
+        self.path = path
+        self.journal_path = path + '.journal'
+        self.flush_interval = compact_interval if journal else flush_interval
+        self.flush_batch = compact_records if journal else flush_batch
+        self.fsync = fsync
+        self.group_commit_delay = group_commit_delay
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.pending = 0
+        self.flushes = 0
+        self.fsyncs = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.items = {item['id']: item for item in load_data(path)}
+        # Never below the ids still present, for snapshots written before the counter existed.
+        self.next_id = max(load_meta(path).get('next_id', 1), max(self.items, default=0) + 1)
+        self.journal = None
+        if journal:
+            # Journals rotated by compactions that did not finish are replayed first, oldest first.
+            journals = rotated_journals(self.journal_path) + [self.journal_path]
+            records = [record for journal_path in journals for record in read_journal(journal_path)]
+            if records:
+                self.next_id = max(self.next_id, replay(self.items, records) + 1)
+                save_meta({'next_id': self.next_id}, path)
+                save_data(list(self.items.values()), path)
+            for stale in journals:
+                if os.path.exists(stale):
+                    os.remove(stale)
+            self._open_journal()
+        self.rotations = 0
+        # Ids in ascending order, for keyset pages; deleted ids are skipped until they make up half of it.
+        self.order = sorted(self.items)
+        self.deleted_in_order = 0
+        self.epoch = os.urandom(4).hex()
+        self.version = 0
+        self.loaded_at = os.path.getmtime(path) if os.path.exists(path) else time.time()
+        self.modified = self.loaded_at
+        # Only items written since startup have an entry; the others share version 0 and loaded_at.
+        self.item_versions = {}
+        self.bodies = BodyCache()
+        # Group commit: sequence numbers of appended and of fsynced records.
+        self.appended_seq = 0
+        self.durable_seq = 0
+        self.sync_lock = threading.Lock()
+        self.sync_cond = threading.Condition()
+        self.syncing = False
+
+    def _open_journal(self):
+        os.makedirs(os.path.dirname(self.journal_path) or '.', exist_ok=True)
+        self.journal = open(self.journal_path, 'a')
+
+    def get(self, item_id):
+        return self.items.get(item_id)
+
+    def create(self, new_item):
+        with self.lock:
+            new_item['id'] = self.next_id
+            self.next_id += 1
+            self.items[new_item['id']] = new_item
+            self.order.append(new_item['id'])
+            self._touch(new_item['id'])
+            seq = self._changed({'op': 'put', 'item': new_item})
+        self._commit(seq)
+        return new_item
+
+    def update(self, item_id, updated_item):
+        with self.lock:
+            if item_id not in self.items:
+                return None
+            updated_item['id'] = item_id
+            self.items[item_id] = updated_item
+            self._touch(item_id)
+            seq = self._changed({'op': 'put', 'item': updated_item})
+        self._commit(seq)
+        return updated_item
+
+    def delete(self, item_id):
+        with self.lock:
+            if self.items.pop(item_id, None) is None:
+                return False
+            self.deleted_in_order += 1
+            if 2 * self.deleted_in_order > len(self.order):
+                self.order = [i for i in self.order if i in self.items]
+                self.deleted_in_order = 0
+            self._touch(item_id, deleted=True)
+            seq = self._changed({'op': 'delete', 'id': item_id})
+        self._commit(seq)
+        return True
+
+    def _touch(self, item_id, deleted=False):
+        # Called with self.lock held, on every write.
+        self.version += 1
+        self.modified = time.time()
+        if deleted:
+            self.item_versions.pop(item_id, None)
+        else:
+            self.item_versions[item_id] = (self.version, self.modified)
+        self.bodies.invalidate(item_id)
+
+    def item_etag(self, item_id):
+        """ETag and modification time of an item, or (None, None) if it does not exist."""
+        with self.lock:
+            if item_id not in self.items:
+                return None, None
+            version, modified = self.item_versions.get(item_id, (0, self.loaded_at))
+            return f'{self.epoch}-i{item_id}-{version}', modified
+
+    def collection_etag(self, variant):
+        """ETag and modification time of a listing; variant tells apart pages and formats."""
+        with self.lock:
+            return f'{self.epoch}-c{self.version}-{variant}', self.modified
+
+    def page(self, cursor=0, limit=PAGE_SIZE):
+        """Up to limit items with id > cursor, in id order, and the cursor of the next page
+        (None after the last one)."""
+        with self.lock:
+            order = self.order
+            i = bisect.bisect_right(order, cursor)
+            page = []
+            while i < len(order) and len(page) < limit:
+                item = self.items.get(order[i])
+                if item is not None:
+                    page.append(item)
+                i += 1
+            return page, (page[-1]['id'] if page and i < len(order) else None)
+
+    def __len__(self):
+        return len(self.items)
+
+    def _changed(self, record):
+        # Called with self.lock held, so journal order is the order of the changes in memory.
+        # The flusher thread starts on the first write only.
+        self.pending += 1
+        if self.journal is not None:
+            self.journal.write(json.dumps(record, separators=(',', ':')) + '\n')
+            self.appended_seq += 1
+            if self.fsync == 'none':
+                # No fsync, but the record leaves the process: a crash of the process alone loses nothing.
+                self.journal.flush()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='items-flusher', daemon=True)
+            self._thread.start()
+        if self.pending >= self.flush_batch:
+            self._wake.set()
+        return self.appended_seq
+
+    def _commit(self, seq):
+        # Returns once record seq is durable according to the fsync policy. In 'group' mode the
+        # first waiting request becomes the leader and one fsync covers every record appended
+        # so far; requests arriving meanwhile wait for the next leader.
+        if self.journal is None or self.fsync == 'none':
+            return
+        if self.fsync == 'always':
+            self._sync()
+            return
+        with self.sync_cond:
+            while self.durable_seq < seq and self.syncing:
+                self.sync_cond.wait()
+            if self.durable_seq >= seq:
+                return
+            self.syncing = True
+        try:
+            if self.group_commit_delay:
+                time.sleep(self.group_commit_delay)
+            self._sync()
+        finally:
+            with self.sync_cond:
+                self.syncing = False
+                self.sync_cond.notify_all()
+
+    def _sync(self):
+        with self.sync_lock:
+            with self.lock:
+                target = self.appended_seq
+                self.journal.flush()
+            os.fsync(self.journal.fileno())
+            self.fsyncs += 1
+            with self.sync_cond:
+                self.durable_seq = max(self.durable_seq, target)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except OSError:
+                # The store stays dirty, so the next round writes it again.
+                app.logger.exception('Writing %s failed', self.path)
+
+    def flush(self):
+        if self.journal is not None:
+            return self.compact()
+        with self.flush_lock:
+            with self.lock:
+                if not self.pending:
+                    return False
+                snapshot = list(self.items.values())
+                meta = {'next_id': self.next_id}
+                self.pending = 0
+            try:
+                # The counter goes first: a crash in between leaves it ahead of the data, never behind.
+                save_meta(meta, self.path)
+                save_data(snapshot, self.path)
+            except OSError:
+                with self.lock:
+                    self.pending += 1  # keep the store dirty, the next round retries
+                raise
+            self.flushes += 1
+            return True
+
+    def compact(self):
+        # Rotate the journal and take the snapshot at the same instant, then write the snapshot.
+        # Rotated journals get increasing numbers and are only removed once a snapshot containing
+        # them is in place: after a failed compaction the next one rotates to a new file, and a
+        # restart in between replays them all.
+        with self.flush_lock:
+            with self.sync_lock, self.lock:
+                if not self.pending:
+                    return False
+                self.journal.flush()
+                os.fsync(self.journal.fileno())
+                self.journal.close()
+                try:
+                    os.replace(self.journal_path, f'{self.journal_path}.old.{self.rotations}')
+                finally:
+                    self._open_journal()
+                self.rotations += 1
+                snapshot = list(self.items.values())
+                meta = {'next_id': self.next_id}
+                self.pending = 0
+                with self.sync_cond:
+                    self.durable_seq = self.appended_seq
+                    self.sync_cond.notify_all()
+            try:
+                save_meta(meta, self.path)
+                save_data(snapshot, self.path)
+            except OSError:
+                with self.lock:
+                    self.pending += 1  # keep the store dirty, the next round retries
+                raise
+            for journal_path in rotated_journals(self.journal_path):
+                os.remove(journal_path)
+            self.flushes += 1
+            return True
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+        if self.journal is not None:
+            self.journal.close()
+
+
+store = ItemStore()
+atexit.register(store.close)
+
+
+def iter_pages(cursor=0):
+    # Page by page, so at most STREAM_CHUNK items are held at once. Each page is consistent,
+    # the listing as a whole is not a snapshot: writes made during it may or may not show up.
+    while cursor is not None:
+        items, cursor = store.page(cursor, STREAM_CHUNK)
+        if items:
+            yield items
+
+
+def stream_json_array():
+    dumps = app.json.dumps
+    yield '['
+    separator = ''
+    for items in iter_pages():
+        yield separator + ','.join(map(dumps, items))
+        separator = ','
+    yield ']'
+
+
+def stream_ndjson():
+    dumps = app.json.dumps
+    for items in iter_pages():
+        yield ''.join(dumps(item) + '\n' for item in items)
+
+
+def http_date(timestamp):
+    # HTTP dates have one-second resolution; truncating keeps If-Modified-Since comparisons exact.
+    return datetime.datetime.fromtimestamp(int(timestamp), datetime.timezone.utc)
+
+
+def not_modified(etag, modified):
+    # If-None-Match wins over If-Modified-Since (RFC 9110); weak comparison is allowed for GET.
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since is not None:
+        return http_date(modified) <= request.if_modified_since
+    return False
+
+
+def with_validators(response, etag, modified, weak=False):
+    response.set_etag(etag, weak=weak)
+    response.last_modified = http_date(modified)
+    # Clients may keep the body but must revalidate it before every use.
+    response.cache_control.no_cache = True
+    return response
+
+
+def cached_json(key, etag, modified, build, mimetype='application/json'):
+    # 304 without touching the data; otherwise the serialized body from the cache, encoded once.
+    if not_modified(etag, modified):
+        return with_validators(Response(status=304), etag, modified)
+    body = store.bodies.get(key, etag)
+    if body is None:
+        body = build().encode('utf-8')
+        store.bodies.put(key, etag, body)
+    return with_validators(Response(body, 200, mimetype=mimetype), etag, modified)
 
 
 @app.route('/items', methods=['GET'])
 def get_items():
-    data = load_data()
-    return jsonify(data), 200
+    # ?limit=&cursor= returns one page; otherwise the whole list is streamed, as a JSON array
+    # (the original response format) or, with ?format=ndjson, one item per line.
+    limit = request.args.get('limit')
+    cursor = request.args.get('cursor')
+    if limit is not None or cursor is not None:
+        try:
+            limit = PAGE_SIZE if limit is None else int(limit)
+            cursor = 0 if cursor is None else int(cursor)
+        except ValueError:
+            return jsonify({'error': 'limit and cursor must be integers'}), 400
+        limit = min(max(limit, 1), MAX_PAGE_SIZE)
+        etag, modified = store.collection_etag(f'p{cursor}.{limit}')
+
+        def build_page():
+            items, next_cursor = store.page(cursor, limit)
+            return app.json.dumps({'items': items, 'next_cursor': next_cursor}) + '\n'
+
+        return cached_json(('page', cursor, limit), etag, modified, build_page)
+    output_format = request.args.get('format', 'json')
+    if output_format not in ('json', 'ndjson'):
+        return jsonify({'error': "format must be 'json' or 'ndjson'"}), 400
+    stream = stream_ndjson if output_format == 'ndjson' else stream_json_array
+    mimetype = 'application/x-ndjson' if output_format == 'ndjson' else 'application/json'
+    etag, modified = store.collection_etag(output_format)
+    if len(store) <= BODY_CACHE_MAX_ITEMS:
+        return cached_json(('list', output_format), etag, modified, lambda: ''.join(stream()), mimetype)
+    if not_modified(etag, modified):
+        return with_validators(Response(status=304), etag, modified, weak=True)
+    # Too large to cache: streamed, with a weak ETag since writes during the stream may show up in it.
+    return with_validators(Response(stream_with_context(stream()), 200, mimetype=mimetype), etag, modified,
+                           weak=True)
 
 
 @app.route('/items/<int:item_id>', methods=['GET'])
 def get_item(item_id):
-    data = load_data()
-    for item in data:
-        if item['id'] == item_id:
-            return jsonify(item), 200
-    return jsonify({'error': 'Item not found'}), 404
+    etag, modified = store.item_etag(item_id)
+    if etag is None:
+        return jsonify({'error': 'Item not found'}), 404
+    return cached_json(('item', item_id), etag, modified, lambda: app.json.dumps(store.get(item_id)) + '\n')
 
 
 @app.route('/items', methods=['POST'])
 def create_item():
-    data = load_data()
-    new_item = request.get_json()
-    new_item['id'] = max([item['id'] for item in data], default=0) + 1
-    data.append(new_item)
-    save_data(data)
-    return jsonify(new_item), 201
+    new_item = store.create(request.get_json())
+    etag, modified = store.item_etag(new_item['id'])
+    return with_validators(jsonify(new_item), etag, modified), 201
 
 
 @app.route('/items/<int:item_id>', methods=['PUT'])
 def update_item(item_id):
-    data = load_data()
-    updated_item = request.get_json()
-    for i, item in enumerate(data):
-        if item['id'] == item_id:
-            updated_item['id'] = item_id
-            data[i] = updated_item
-            save_data(data)
-            return jsonify(updated_item), 200
+    updated_item = store.update(item_id, request.get_json())
+    if updated_item is not None:
+        etag, modified = store.item_etag(item_id)
+        return with_validators(jsonify(updated_item), etag, modified), 200
     return jsonify({'error': 'Item not found'}), 404
 
 
 @app.route('/items/<int:item_id>', methods=['DELETE'])
 def delete_item(item_id):
-    data = load_data()
-    for i, item in enumerate(data):
-        if item['id'] == item_id:
-            data.pop(i)
-            save_data(data)
-            return jsonify({'message': 'Item deleted'}), 200
+    if store.delete(item_id):
+        return jsonify({'message': 'Item deleted'}), 200
     return jsonify({'error': 'Item not found'}), 404
 
 if __name__ == '__main__':
@@ -72,4 +559,6 @@ if __name__ == '__main__':
     if not os.path.exists(DATA_FILE):
         with open(DATA_FILE, 'w') as f:
             json.dump([], f)
+    # SIGTERM normally skips atexit; turn it into a regular exit so pending writes are flushed.
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
     app.run(debug=True)
@@ -0,0 +1,89 @@
+import argparse
+import gc
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import HW5
+
+
+# Latency of the items API operations as the store grows. Each size gets a fresh
+# data directory with n items; the same number of operations is timed at every
+# size, both directly on the ItemStore and through the Flask routes.
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+
+def time_ops(operation, ids):
+    # The cyclic GC is off while timing: a full collection walks every item, which would
+    # show up as a size-dependent cost that has nothing to do with the store.
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter_ns()
+        for item_id in ids:
+            operation(item_id)
+        return (time.perf_counter_ns() - start) / len(ids)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def run_size(size, ops):
+    directory = tempfile.mkdtemp(prefix='items-bench-')
+    path = os.path.join(directory, 'items.json')
+    try:
+        HW5.save_data([{'id': i, 'name': f'item {i}', 'price': i % 100} for i in range(1, size + 1)], path)
+        # No flushes during the measurement: only the in-memory work is timed.
+        store = HW5.ItemStore(path, flush_interval=3600, flush_batch=10 ** 12)
+        step = max(1, size // ops)
+        ids = list(range(1, size + 1, step))[:ops]
+
+        result = {'items': size, 'ops': len(ids)}
+        result['get_ns'] = time_ops(store.get, ids)
+        result['update_ns'] = time_ops(lambda item_id: store.update(item_id, {'name': 'updated'}), ids)
+        created = []
+        result['create_ns'] = time_ops(lambda _: created.append(store.create({'name': 'new'})['id']), ids)
+        result['delete_ns'] = time_ops(store.delete, ids)
+
+        # The routes read the module-level store, so it is swapped for this one meanwhile.
+        client = HW5.app.test_client()
+        HW5.store, previous = store, HW5.store
+        try:
+            live = list(store.items)[:len(ids)]
+            result['route_get_ns'] = time_ops(lambda item_id: client.get(f'/items/{item_id}'), live)
+            result['route_put_ns'] = time_ops(lambda item_id: client.put(f'/items/{item_id}', json={'name': 'x'}),
+                                              live)
+        finally:
+            HW5.store = previous
+        # Ids are never reused: a create after the deletes still gets a fresh id.
+        result['ids_reused'] = sum(1 for item_id in created if item_id <= size)
+        result['ids_reused'] += store.create({})['id'] <= created[-1]
+        return result
+    finally:
+        shutil.rmtree(directory)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Latency of the items API from 1k to 1M items.')
+    parser.add_argument('--sizes', type=lambda v: [int(x) for x in v.split(',') if x], default=DEFAULT_SIZES)
+    parser.add_argument('--ops', type=int, default=2000)
+    parser.add_argument('--output', default=None, help='write the results as JSON to this file')
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'items':>9} {'get':>8} {'update':>8} {'create':>8} {'delete':>8} {'GET /id':>9} {'PUT /id':>9}  (ns/op)")
+    for size in args.sizes:
+        r = run_size(size, args.ops)
+        results.append(r)
+        print(f"{r['items']:>9} {r['get_ns']:>8.0f} {r['update_ns']:>8.0f} {r['create_ns']:>8.0f} "
+              f"{r['delete_ns']:>8.0f} {r['route_get_ns']:>9.0f} {r['route_put_ns']:>9.0f}"
+              + (f"  ids reused: {r['ids_reused']}" if r['ids_reused'] else ""))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == '__main__':
+    main()
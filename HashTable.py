@@ -1,6 +1,13 @@
 import csv
 import random
 import datetime
+import hashlib
+import json
+import os
+import pickle
+
+from CNP_HashTable import HashTable
+from Laborator_CNP import PrefixIndex, sample_keys
 
 # --- Etapa 1: Generarea datelor ---
 
@@ -36,7 +43,7 @@ def is_valid_cnp(cnp):
     control_digit = int(cnp[12])
     return calculate_control_digit(prefix) == control_digit
 
-def generate_date_of_birth(age_group):
+def generate_date_of_birth(age_group, rng=random):
     """Generates a random date of birth within a given age group.
     For simplicity, let's define age groups roughly."""
     current_year = datetime.datetime.now().year
@@ -53,27 +60,27 @@ def generate_date_of_birth(age_group):
         start_year = current_year - 50
         end_year = current_year - 40
 
-    year = random.randint(start_year, end_year)
-    month = random.randint(1, 12)
-    day = random.randint(1, 28) # Keep it simpler, not checking days per month for example purposes
+    year = rng.randint(start_year, end_year)
+    month = rng.randint(1, 12)
+    day = rng.randint(1, 28) # Keep it simpler, not checking days per month for example purposes
     return year, month, day
 
-def generate_name(sex):
+def generate_name(sex, rng=random):
     """Generates a random name based on sex (using simplified name lists)."""
     male_first_names = ["Ion", "Gheorghe", "Vasile", "Marian", "Andrei", "Mihai", "Florin", "Daniel", "Cristian", "Adrian"]
     female_first_names = ["Maria", "Elena", "Cristina", "Ana", "Gabriela", "Ioana", "Andreea", "Daniela", "Alexandra", "Mihaela"]
     last_names = ["Popescu", "Ionescu", "Georgescu", "Dumitrescu", "Avram", "Moldovan", "Rusu", "Marinescu", "Stan", "Dinu"]
 
     if sex == 1 or sex == 3 or sex == 5 or sex == 7: # Male
-        first_name = random.choice(male_first_names)
+        first_name = rng.choice(male_first_names)
     else: # Female - 2, 4, 6, 8
-        first_name = random.choice(female_first_names)
-    last_name = random.choice(last_names)
+        first_name = rng.choice(female_first_names)
+    last_name = rng.choice(last_names)
     return f"{first_name} {last_name}"
 
-def generate_data(num_cnps=1000000):
+def generate_data(num_cnps=1000000, rng=random):
     """Generates CNPs and names and saves to CSV.
-    Uses simplified distribution for demonstration."""
+    Uses simplified distribution for demonstration; rng defaults to the global random module."""
 
     county_codes = list(range(1, 43)) # Romanian county codes (1-42) + Bucharest (46)
     county_codes.append(46) # Adding Bucharest
@@ -82,11 +89,11 @@ def generate_data(num_cnps=1000000):
 
     cnp_data = []
     for _ in range(num_cnps):
-        sex = random.choice(sexes)
-        age_group = random.choice(age_groups)
-        year, month, day = generate_date_of_birth(age_group)
-        county_code = random.choice(county_codes)
-        sequence_number = random.randint(1, 999) # Simplified sequence
+        sex = rng.choice(sexes)
+        age_group = rng.choice(age_groups)
+        year, month, day = generate_date_of_birth(age_group, rng)
+        county_code = rng.choice(county_codes)
+        sequence_number = rng.randint(1, 999) # Simplified sequence
 
         # Adjust sex digit based on year (simplified for 1900-2099 range)
         if year >= 2000:
@@ -99,102 +106,213 @@ def generate_data(num_cnps=1000000):
 
 
         cnp = generate_cnp(sex, year, month, day, county_code, sequence_number)
-        name = generate_name(sex)
+        name = generate_name(sex, rng)
         cnp_data.append({"CNP": cnp, "Nume": name})
 
     return cnp_data
 
 
-# Generate and save to CSV
-num_cnps_to_generate = 1000000
-generated_data = generate_data(num_cnps_to_generate)
+# --- Etapa 2: Implementarea și popularea unui hash table ---
 
-csv_filename = "cnp_data.csv"
-with open(csv_filename, mode='w', newline='', encoding='utf-8') as csvfile:
-    fieldnames = ['CNP', 'Nume']
-    writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-    writer.writeheader()
-    writer.writerows(generated_data)
+# HashTable lives in CNP_HashTable, so a table cached while this file runs as a script
+# pickles as CNP_HashTable.HashTable (not __main__.HashTable) and loads from either entry point.
 
-print(f"Fisierul CSV '{csv_filename}' a fost generat cu {num_cnps_to_generate} CNP-uri.")
 
+# --- Etapele pipeline-ului, cu cache pe disc ---
 
-# --- Etapa 2: Implementarea și popularea unui hash table ---
-
-class HashTable:
-    def __init__(self, capacity):
-        self.capacity = capacity
-        self.table = [[] for _ in range(capacity)] # Separate chaining using lists
+CACHE_DIR = ".cnp_cache"
+PIPELINE_VERSION = 1 # Bump when a stage changes its output for the same parameters
 
-    def hash_function(self, key):
-        """Simple hash function: sum of digits modulo capacity."""
-        key_str = str(key)
-        hash_value = 0
-        for digit in key_str:
-            hash_value += int(digit)
-        return hash_value % self.capacity
 
-    def insert(self, key, value):
-        """Inserts a key-value pair into the hash table."""
-        index = self.hash_function(key)
-        bucket = self.table[index]
-        bucket.append((key, value)) # Append as tuple: (key, value)
+def artifact_path(stage, params, extension, cache_dir=CACHE_DIR):
+    """Content-addressed path of a stage artifact: the file name is a hash of the stage parameters."""
+    key = json.dumps({"stage": stage, "version": PIPELINE_VERSION, **params}, sort_keys=True)
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{stage}-{digest}{extension}")
 
-    def search(self, key):
-        """Searches for a key in the hash table and returns the value and iterations."""
-        index = self.hash_function(key)
-        bucket = self.table[index]
-        iterations = 0
-        for k, v in bucket:
-            iterations += 1
-            if k == key:
-                return v, iterations # Value found, return value and iterations
-        return None, iterations # Key not found, return None and iterations count
 
+def write_atomic(path, write):
+    """Writes an artifact through a temporary file, so an interrupted run never leaves a partial one."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, mode="wb") as f:
+        write(f)
+    os.replace(tmp_path, path)
 
-# Popularea Hash Table
-hash_table_capacity = 1000037 # Prime number slightly larger than 1 million for better distribution
-hash_table = HashTable(hash_table_capacity)
 
-for item in generated_data:
-    hash_table.insert(item["CNP"], item["Nume"])
-
-print("Hash table populated.")
+class CNPPipeline:
+    """generate -> persist -> index -> query, each stage run only when asked for.
 
+    Every stage caches its result under CACHE_DIR, keyed by its own parameters and by the key of
+    the stage before it, so a repeated run with the same inputs loads the index and goes straight
+    to querying. Nothing is computed on construction."""
+    def __init__(self, num_cnps=1000000, seed=0, capacity=1000037, hash_strategy="digit_sum",
+                 bloom_fp_rate=0.01, encode_values=True, cache_dir=CACHE_DIR):
+        self.num_cnps = num_cnps
+        self.seed = seed
+        self.capacity = capacity
+        self.hash_strategy = hash_strategy
+        self.bloom_fp_rate = bloom_fp_rate
+        self.encode_values = encode_values
+        self.cache_dir = cache_dir
+        self._data = None
+        self._table = None
+        self._prefix_index = None
+
+    def data_params(self):
+        # generate_date_of_birth depends on the current year, so it is part of the key.
+        return {"num_cnps": self.num_cnps, "seed": self.seed, "year": datetime.datetime.now().year}
+
+    def index_params(self):
+        return {**self.data_params(), "capacity": self.capacity, "hash": self.hash_strategy,
+                "bloom_fp_rate": self.bloom_fp_rate, "encode_values": self.encode_values}
+
+    def generate(self):
+        """Generates the records in memory, from a random generator of its own seeded with seed."""
+        if self._data is None:
+            self._data = generate_data(self.num_cnps, random.Random(self.seed))
+        return self._data
+
+    def persist(self):
+        """Returns the path of the CSV for these parameters, generating it only if it is not cached."""
+        path = artifact_path("data", self.data_params(), ".csv", self.cache_dir)
+        if not os.path.exists(path):
+            rows = "".join(f"{item['CNP']},{item['Nume']}\r\n" for item in self.generate())
+            write_atomic(path, lambda f: f.write(("CNP,Nume\r\n" + rows).encode("utf-8")))
+            print(f"Fisierul CSV '{path}' a fost generat cu {self.num_cnps} CNP-uri.")
+        return path
+
+    def index(self):
+        """Returns the populated hash table, unpickled from the cache when possible."""
+        if self._table is not None:
+            return self._table
+        path = artifact_path("index", self.index_params(), ".pickle", self.cache_dir)
+        if os.path.exists(path):
+            try:
+                with open(path, mode="rb") as f:
+                    self._table = pickle.load(f)
+                return self._table
+            except (pickle.UnpicklingError, AttributeError, EOFError, ImportError):
+                pass # Stale or written by an incompatible version: rebuild below
+
+        table = HashTable(self.capacity, self.hash_strategy, bloom_fp_rate=self.bloom_fp_rate,
+                          encode_values=self.encode_values)
+        with open(self.persist(), mode="r", newline="", encoding="utf-8") as csvfile:
+            reader = csv.reader(csvfile)
+            next(reader)
+            for cnp, name in reader:
+                table.insert(cnp, name)
+        if self.hash_strategy != "siphash": # hash() is randomized per process, the buckets would not match
+            write_atomic(path, lambda f: pickle.dump(table, f, protocol=pickle.HIGHEST_PROTOCOL))
+        print("Hash table populated.")
+        self._table = table
+        return table
+
+    def prefix_index(self):
+        """Returns the sorted CNP index used for prefix searches, cached like the hash table."""
+        if self._prefix_index is not None:
+            return self._prefix_index
+        path = artifact_path("prefix", self.data_params(), ".pickle", self.cache_dir)
+        if os.path.exists(path):
+            try:
+                with open(path, mode="rb") as f:
+                    self._prefix_index = pickle.load(f)
+                return self._prefix_index
+            except (pickle.UnpicklingError, AttributeError, EOFError, ImportError):
+                pass
+
+        with open(self.persist(), mode="r", newline="", encoding="utf-8") as csvfile:
+            reader = csv.reader(csvfile)
+            next(reader)
+            index = PrefixIndex((cnp, name) for cnp, name in reader)
+        write_atomic(path, lambda f: pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL))
+        self._prefix_index = index
+        return index
+
+    def sample(self, num_searches=1000):
+        """Returns num_searches CNPs drawn from the dataset, cached like the other stages."""
+        path = artifact_path("sample", {**self.data_params(), "num_searches": num_searches}, ".json",
+                             self.cache_dir)
+        if os.path.exists(path):
+            with open(path, mode="r") as f:
+                return json.load(f)
+        # Always from the CSV, so the artifact does not depend on whether the records are in memory.
+        selected = sample_keys(self.persist(), num_searches, seed=self.seed)
+        write_atomic(path, lambda f: f.write(json.dumps(selected).encode("utf-8")))
+        return selected
+
+    def query(self, num_searches=1000):
+        """Runs num_searches searches for existing CNPs and prints the statistics."""
+        hash_table = self.index()
+        random_cnps_to_search = self.sample(num_searches)
+
+        total_iterations = 0
+        found_count = 0
+
+        for cnp_to_find in random_cnps_to_search:
+            name_found, iterations = hash_table.search(cnp_to_find)
+            total_iterations += iterations
+            if name_found:
+                found_count += 1
+            else:
+                print(f"CNP '{cnp_to_find}' not found in hash table (which should not happen for generated data).") # For debugging only
+
+        average_iterations = total_iterations / num_searches
+
+        print(f"\n--- Rezultate Statiscice Cautari ---")
+        print(f"Numar total de cautari: {num_searches}")
+        print(f"CNP-uri gasite: {found_count}")
+        print(f"Iteratii totale pentru cautari: {total_iterations}")
+        print(f"Iteratii medii per cautare: {average_iterations:.2f}")
+        return {"searches": num_searches, "found": found_count, "total_iterations": total_iterations,
+                "average_iterations": average_iterations}
 
-# --- Etapa 3: Prezentarea rezultatelor statistice ---
 
-num_searches = 1000
-random_cnps_to_search = random.sample(generated_data, num_searches)
+# --- Interfață simplă de căutare ---
 
-total_iterations = 0
-found_count = 0
+PREFIX_PAGE_SIZE = 20
 
-for item in random_cnps_to_search:
-    cnp_to_find = item["CNP"]
-    name_found, iterations = hash_table.search(cnp_to_find)
-    total_iterations += iterations
-    if name_found:
-        found_count += 1
-    else:
-        print(f"CNP '{cnp_to_find}' not found in hash table (which should not happen for generated data).") # For debugging only
 
-average_iterations = total_iterations / num_searches
+def search_prefix_interface(prefix_index, prefix, offset=0):
+    """Prints one page of the CNPs starting with prefix."""
+    total, page = prefix_index.search_prefix(prefix, PREFIX_PAGE_SIZE, offset)
+    print(f"{total} CNP-uri incep cu {prefix}" + (f" (afisate {offset + 1}-{offset + len(page)}):" if page else "."))
+    for cnp, name in page:
+        print(f"CNP: {cnp} - Nume: {name}")
+    if offset + len(page) < total:
+        print(f"Pentru pagina urmatoare introduceti: {prefix} {offset + len(page)}")
 
-print(f"\n--- Rezultate Statiscice Cautari ---")
-print(f"Numar total de cautari: {num_searches}")
-print(f"CNP-uri gasite: {found_count}")
-print(f"Iteratii totale pentru cautari: {total_iterations}")
-print(f"Iteratii medii per cautare: {average_iterations:.2f}")
 
+def search_name_interface(hash_table, name, offset=0):
+    """Prints one page of the CNPs registered under an exact name, using the inverted name index."""
+    total = hash_table.names.count_named(name)
+    cnps = hash_table.find_by_name(name, PREFIX_PAGE_SIZE, offset)
+    print(f"{total} persoane cu numele {name}" + (f" (afisate {offset + 1}-{offset + len(cnps)}):" if cnps else "."))
+    for cnp in cnps:
+        print(f"CNP: {cnp} - Nume: {name}")
+    if offset + len(cnps) < total:
+        print(f"Pentru pagina urmatoare introduceti: {name} {offset + len(cnps)}")
 
-# --- Interfață simplă de căutare ---
 
-def search_cnp_interface():
+def search_cnp_interface(hash_table, prefix_index=None):
     while True:
-        cnp_to_search = input("\nIntroduceti CNP-ul pentru cautare (sau 'exit' pentru a iesi): ")
+        cnp_to_search = input("\nIntroduceti CNP-ul, primele cifre sau un nume (sau 'exit' pentru a iesi): ")
         if cnp_to_search.lower() == 'exit':
             break
+        # Partial CNP, optionally followed by an offset: "1850101" or "1850101 20"
+        parts = cnp_to_search.split()
+        if prefix_index is not None and parts and parts[0].isdigit() and len(parts[0]) < 13:
+            if len(parts) == 1 or (len(parts) == 2 and parts[1].isdigit()):
+                search_prefix_interface(prefix_index, parts[0], int(parts[1]) if len(parts) == 2 else 0)
+                continue
+        # A name, optionally followed by an offset: "Ion Popescu" or "Ion Popescu 20".
+        # Names have letters and no digits, so a mistyped CNP still gets "CNP invalid" below.
+        if hash_table.names is not None and parts:
+            has_offset = len(parts) > 1 and parts[-1].isdigit()
+            name = " ".join(parts[:-1] if has_offset else parts)
+            if any(ch.isalpha() for ch in name) and not any(ch.isdigit() for ch in name):
+                search_name_interface(hash_table, name, int(parts[-1]) if has_offset else 0)
+                continue
         if not is_valid_cnp(cnp_to_search):
             print("CNP invalid. Va rugam introduceti un CNP valid.")
             continue
@@ -206,5 +324,7 @@ def search_cnp_interface():
             print(f"CNP '{cnp_to_search}' nu a fost gasit in hash table.") # Should not happen with data generated here, but good for general case.
 
 if __name__ == "__main__":
+    pipeline = CNPPipeline()
+    pipeline.query()
     print("\n--- Interfață Cautare CNP ---")
-    search_cnp_interface()
\ No newline at end of file
+    search_cnp_interface(pipeline.index(), pipeline.prefix_index())
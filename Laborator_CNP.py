@@ -3,6 +3,19 @@ import csv
 import datetime
 import sys
 import os
+import gc
+import math
+import bisect
+import time
+from itertools import chain, islice
+import json
+import mmap
+from collections import Counter
+import struct
+import shutil
+from multiprocessing import Pool
+from array import array
+import zlib
 
 
 prenume_list = ["Ana", "Ion", "Maria", "George", "Elena", "Mihai", "Ioana", "Vasile", "Gabriela", "Andrei"]
@@ -17,18 +30,20 @@ def random_sex():
 
 def random_date():
 
-    start_date = datetime.date(1900, 1, 1)
-    end_date = datetime.date(2000, 12, 31)
-    delta = (end_date - start_date).days
+    delta = (DATE_END - DATE_START).days
     random_day = random.randint(0, delta)
-    d = start_date + datetime.timedelta(days=random_day)
+    d = DATE_START + datetime.timedelta(days=random_day)
     return d.year, d.month, d.day
 
 
+CONTROL_WEIGHTS = [2, 7, 9, 1, 4, 6, 3, 5, 8, 2, 7, 9]
+DATE_START = datetime.date(1900, 1, 1)
+DATE_END = datetime.date(2000, 12, 31)
+
+
 def calc_control(cnp12):
 
-    weights = [2, 7, 9, 1, 4, 6, 3, 5, 8, 2, 7, 9]
-    s = sum(int(digit) * weight for digit, weight in zip(cnp12, weights))
+    s = sum(int(digit) * weight for digit, weight in zip(cnp12, CONTROL_WEIGHTS))
     remainder = s % 11
     return remainder if remainder != 10 else 1
 
@@ -69,32 +84,1173 @@ def generate_data_csv(filename="cnp_data.csv", total=1_000_000):
     print(f"\nFișierul {filename} a fost generat cu {total} înregistrări.")
 
 
+# Generare vectorizată: blocuri întregi de CNP-uri sunt construite ca array-uri
+# NumPy (sex, dată, județ, secvență), iar cifra de control se calculează pentru
+# tot blocul deodată. Distribuțiile sunt aceleași ca în generate_cnp.
+def generate_cnp_block(rng, count):
+
+    sex = rng.integers(1, 3, count)
+    days = rng.integers(0, (DATE_END - DATE_START).days + 1, count)
+    judet = rng.integers(1, 53, count)
+    nnn = rng.integers(1, 1000, count)
+    return assemble_cnp_block(sex, days, judet, nnn)
+
+
+def assemble_cnp_block(sex, days, judet, nnn):
+    import numpy as np
+
+    count = len(sex)
+    dates = np.datetime64(DATE_START.isoformat(), "D") + days.astype("timedelta64[D]")
+    month_start = dates.astype("datetime64[M]")
+    year = dates.astype("datetime64[Y]").astype(np.int64) + 1970
+    month = month_start.astype(np.int64) % 12 + 1
+    day = (dates - month_start).astype(np.int64) + 1
+
+    yy = year % 100
+    digits = np.empty((count, 12), dtype=np.int64)
+    digits[:, 0] = sex
+    digits[:, 1], digits[:, 2] = divmod(yy, 10)
+    digits[:, 3], digits[:, 4] = divmod(month, 10)
+    digits[:, 5], digits[:, 6] = divmod(day, 10)
+    digits[:, 7], digits[:, 8] = divmod(judet, 10)
+    digits[:, 9] = nnn // 100
+    digits[:, 10], digits[:, 11] = divmod(nnn % 100, 10)
+
+    control = digits @ np.array(CONTROL_WEIGHTS, dtype=np.int64) % 11
+    control[control == 10] = 1
+
+    prefix = (sex * 10 ** 11 + yy * 10 ** 9 + month * 10 ** 7 + day * 10 ** 5
+              + judet * 10 ** 3 + nnn)
+    return prefix * 10 + control
+
+
+# Generare fără duplicate: fiecare (sex, dată, județ) este un slot cu propriul
+# contor de secvență, ca la alocarea reală a CNP-urilor. Rândul primește slotul
+# cu aceeași distribuție ca în generate_cnp_block și următorul NNN liber din
+# slot, deci două rânduri nu pot primi același CNP. Contoarele sunt un singur
+# vector uint16 (2 * 36.890 zile * 52 județe, ~7,7 MB), indiferent câte
+# înregistrări se generează.
+SEQUENCES_PER_SLOT = 999
+COUNTIES = 52
+
+
+class UniqueCNPAllocator:
+    def __init__(self, rng):
+        import numpy as np
+
+        self.rng = rng
+        self.days = (DATE_END - DATE_START).days + 1
+        self.days_2000 = (datetime.date(2000, 1, 1) - DATE_START).days
+        self.slots = 2 * self.days * COUNTIES
+        self.counters = np.zeros(self.slots, dtype=np.uint16)
+        self.allocated = 0
+        self.spilled = 0
+
+    @property
+    def capacity(self):
+        return self.slots * SEQUENCES_PER_SLOT
+
+    def _sequence_in_slot(self, slots):
+        import numpy as np
+
+        # Al câtelea rând din bloc cade în slotul lui: după sortare, poziția
+        # minus începutul grupului; NNN = contorul slotului + rangul + 1.
+        order = np.argsort(slots, kind="stable")
+        ordered = slots[order]
+        group_start = np.flatnonzero(np.r_[True, ordered[1:] != ordered[:-1]])
+        group_sizes = np.diff(np.r_[group_start, len(ordered)])
+        rank = np.empty(len(slots), dtype=np.int64)
+        rank[order] = np.arange(len(slots)) - np.repeat(group_start, group_sizes)
+        return self.counters[slots].astype(np.int64) + rank + 1
+
+    def _spill(self, count):
+        import numpy as np
+
+        # Rândurile ale căror sloturi sunt pline se distribuie, fără reîncercări,
+        # pe capacitatea liberă a celorlalte sloturi, începând de la un slot aleator.
+        order = np.roll(np.arange(self.slots), -int(self.rng.integers(self.slots)))
+        free = SEQUENCES_PER_SLOT - self.counters[order].astype(np.int64)
+        filled = np.cumsum(free)
+        position = np.searchsorted(filled, np.arange(count), side="right")
+        slots = order[position]
+        nnn = self.counters[slots].astype(np.int64) + np.arange(count) - (filled[position] - free[position]) + 1
+        self.counters += np.bincount(slots, minlength=self.slots).astype(np.uint16)
+        self.spilled += count
+        return slots, nnn
+
+    def draw(self, count):
+        import numpy as np
+
+        if self.allocated + count > self.capacity:
+            raise ValueError(f"Spațiul CNP are doar {self.capacity} combinații; "
+                             f"{self.allocated} sunt deja alocate.")
+        sex = self.rng.integers(1, 3, count)
+        days = self.rng.integers(0, self.days, count)
+        judet = self.rng.integers(1, COUNTIES + 1, count)
+        slots = ((sex - 1) * self.days + days) * COUNTIES + (judet - 1)
+
+        nnn = self._sequence_in_slot(slots)
+        full = nnn > SEQUENCES_PER_SLOT
+        used = np.bincount(slots, minlength=self.slots)
+        self.counters = np.minimum(self.counters + used, SEQUENCES_PER_SLOT).astype(np.uint16)
+        if full.any():
+            slots[full], nnn[full] = self._spill(int(full.sum()))
+            rest, judet[full] = np.divmod(slots[full], COUNTIES)
+            judet[full] += 1
+            sex[full], days[full] = np.divmod(rest, self.days)
+            sex[full] += 1
+        self.allocated += count
+        # 1900 și 2000 au același AA: născuții din 2000 primesc cifra 5/6, cum
+        # cere regula CNP, altfel 01.01.1900 și 01.01.2000 ar da același CNP.
+        sex += 4 * (days >= self.days_2000)
+        return assemble_cnp_block(sex, days, judet, nnn)
+
+    def stats(self):
+        import numpy as np
+
+        return {
+            "allocated": self.allocated,
+            "capacity": self.capacity,
+            "space_used": self.allocated / self.capacity,
+            "slots": self.slots,
+            "slots_used": int(np.count_nonzero(self.counters)),
+            "max_sequence": int(self.counters.max()),
+            "spilled": self.spilled,
+            "counter_bytes": self.counters.nbytes,
+        }
+
+
+def print_allocator_stats(stats):
+
+    print(f"\nCNP-uri unice: {stats['allocated']} din {stats['capacity']} posibile "
+          f"({stats['space_used']:.4%} din spațiu), {stats['slots_used']} din {stats['slots']} "
+          f"sloturi (sex, dată, județ) folosite, NNN maxim {stats['max_sequence']}.")
+
+
+def format_block_rows(cnps, name_ids, full_names):
+
+    # csv.writer folosește implicit terminatorul "\r\n"; numele nu conțin
+    # virgule sau ghilimele, deci nu au nevoie de quoting.
+    return "".join(map("{},{}\r\n".format, cnps.tolist(), map(full_names.__getitem__, name_ids.tolist())))
+
+
+def generate_data_csv_batch(filename="cnp_data.csv", total=1_000_000, block_size=1_000_000, seed=None,
+                            header=True, verbose=True, unique=False):
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    allocator = UniqueCNPAllocator(rng) if unique else None
+    full_names = [f"{prenume} {nume}" for prenume in prenume_list for nume in nume_list]
+    with open(filename, mode="w", newline="") as csvfile:
+        if header:
+            csvfile.write("CNP,Nume\r\n")
+        written = 0
+        while written < total:
+            count = min(block_size, total - written)
+            cnps = allocator.draw(count) if unique else generate_cnp_block(rng, count)
+            name_ids = rng.integers(0, len(full_names), count)
+            csvfile.write(format_block_rows(cnps, name_ids, full_names))
+            written += count
+            if verbose:
+                print(f"{written} înregistrări generate...")
+    if verbose:
+        print(f"\nFișierul {filename} a fost generat cu {total} înregistrări.")
+        if unique:
+            print_allocator_stats(allocator.stats())
+    return allocator.stats() if unique else None
+
+
+# Generare paralelă: total este împărțit în shard-uri, fiecare cu seed-ul derivat
+# din seed-ul principal prin SeedSequence.spawn, deci rezultatul depinde doar de
+# (seed, workers). Fiecare proces își scrie shard-ul în propriul fișier.
+def _generate_shard(task):
+    shard_filename, count, seed_sequence = task
+    generate_data_csv_batch(shard_filename, count, seed=seed_sequence, header=False, verbose=False)
+    return shard_filename, count
+
+
+def generate_data_csv_parallel(filename="cnp_data.csv", total=1_000_000, workers=None, seed=0, concatenate=True):
+    import numpy as np
+
+    workers = workers or os.cpu_count() or 1
+    base, ext = os.path.splitext(filename)
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    per_shard, extra = divmod(total, workers)
+    tasks = [(f"{base}.part{i:03d}{ext}", per_shard + (1 if i < extra else 0), seeds[i]) for i in range(workers)]
+
+    with Pool(workers) as pool:
+        pool.map(_generate_shard, tasks)
+
+    manifest = {
+        "filename": filename,
+        "total": total,
+        "seed": seed,
+        "workers": workers,
+        "header": ["CNP", "Nume"],
+        "shards": [{"file": shard_filename, "rows": count, "spawn_key": list(seq.spawn_key)}
+                   for shard_filename, count, seq in tasks],
+    }
+
+    if concatenate:
+        with open(filename, mode="wb") as out:
+            out.write(b"CNP,Nume\r\n")
+            for shard_filename, _, _ in tasks:
+                with open(shard_filename, mode="rb") as shard:
+                    shutil.copyfileobj(shard, out, 1 << 20)
+                os.remove(shard_filename)
+        print(f"\nFișierul {filename} a fost generat cu {total} înregistrări ({workers} procese).")
+    else:
+        manifest_filename = f"{base}.manifest.json"
+        with open(manifest_filename, mode="w") as f:
+            json.dump(manifest, f, indent=4)
+        print(f"\n{workers} shard-uri generate; manifestul este în {manifest_filename}.")
+    return manifest
+
+
+# Format columnar binar, alternativa la cnp_data.csv. Antetul fix are 64 de
+# octeți (magic, versiune, rânduri, poziția și lungimea schemei), urmat de o
+# schemă JSON cu tipul și poziția fiecărei coloane. CNP-urile sunt uint64, iar
+# numele sunt codificate ca id-uri mici într-un dicționar (tabela de șiruri
+# din schemă). Coloanele încep la poziții multiple de 64, deci fiecare se
+# încarcă cu un singur np.fromfile sau se mapează cu np.memmap.
+COLUMNAR_MAGIC = b"CNPCOL01"
+COLUMNAR_HEADER = struct.Struct("<8sIQQQ")
+COLUMNAR_HEADER_SIZE = 64
+COLUMNAR_ALIGN = 64
+
+
+def _align(offset):
+
+    return -(-offset // COLUMNAR_ALIGN) * COLUMNAR_ALIGN
+
+
+def columnar_schema(rows, names):
+
+    # Pozițiile coloanelor depind doar de numărul de rânduri și de dicționar,
+    # deci schema poate fi scrisă înainte de date (și completată apoi pe blocuri).
+    name_dtype = "<u2" if len(names) <= 1 << 16 else "<u4"
+    schema = {"rows": rows, "columns": [
+        {"name": "CNP", "dtype": "<u8", "offset": 0},
+        {"name": "Nume", "dtype": name_dtype, "offset": 0, "dictionary": list(names)},
+    ]}
+    # Lungimea schemei depinde de poziții, care depind de lungimea schemei: a
+    # doua trecere folosește o limită superioară, pozițiile ajung aliniate oricum.
+    for _ in range(2):
+        offset = _align(COLUMNAR_HEADER_SIZE + len(json.dumps(schema).encode("utf-8")) + 32)
+        for column in schema["columns"]:
+            column["offset"] = offset
+            offset = _align(offset + rows * int(column["dtype"][2:]))
+    return schema
+
+
+def _write_columnar_header(f, schema):
+    payload = json.dumps(schema).encode("utf-8")
+    if COLUMNAR_HEADER_SIZE + len(payload) > schema["columns"][0]["offset"]:
+        raise ValueError("Schema columnară nu încape înaintea primei coloane.")
+    f.seek(0)
+    f.write(COLUMNAR_HEADER.pack(COLUMNAR_MAGIC, 1, schema["rows"], COLUMNAR_HEADER_SIZE,
+                                 len(payload)).ljust(COLUMNAR_HEADER_SIZE, b"\0"))
+    f.write(payload)
+
+
+def write_columnar(filename, cnps, name_ids, names):
+    import numpy as np
+
+    schema = columnar_schema(len(cnps), names)
+    cnp_column, name_column = schema["columns"]
+    tmp_filename = filename + ".tmp"
+    with open(tmp_filename, mode="wb") as f:
+        _write_columnar_header(f, schema)
+        f.seek(cnp_column["offset"])
+        np.asarray(cnps, dtype=cnp_column["dtype"]).tofile(f)
+        f.seek(name_column["offset"])
+        np.asarray(name_ids, dtype=name_column["dtype"]).tofile(f)
+        f.truncate(_align(name_column["offset"] + len(cnps) * int(name_column["dtype"][2:])))
+    os.replace(tmp_filename, filename)
+
+
+def generate_data_columnar(filename="cnp_data.col", total=1_000_000, block_size=1_000_000, seed=None,
+                           verbose=True, unique=False):
+    import numpy as np
+
+    # Același flux de numere aleatoare ca generate_data_csv_batch, deci pentru
+    # același seed (și același unique) fișierele conțin aceleași rânduri.
+    rng = np.random.default_rng(seed)
+    allocator = UniqueCNPAllocator(rng) if unique else None
+    full_names = [f"{prenume} {nume}" for prenume in prenume_list for nume in nume_list]
+    schema = columnar_schema(total, full_names)
+    cnp_column, name_column = schema["columns"]
+    tmp_filename = filename + ".tmp"
+    with open(tmp_filename, mode="wb") as f:
+        _write_columnar_header(f, schema)
+        written = 0
+        while written < total:
+            count = min(block_size, total - written)
+            cnps = allocator.draw(count) if unique else generate_cnp_block(rng, count)
+            name_ids = rng.integers(0, len(full_names), count)
+            f.seek(cnp_column["offset"] + 8 * written)
+            cnps.astype(cnp_column["dtype"]).tofile(f)
+            f.seek(name_column["offset"] + int(name_column["dtype"][2:]) * written)
+            name_ids.astype(name_column["dtype"]).tofile(f)
+            written += count
+            if verbose:
+                print(f"{written} înregistrări generate...")
+        f.truncate(_align(name_column["offset"] + total * int(name_column["dtype"][2:])))
+    os.replace(tmp_filename, filename)
+    if verbose:
+        print(f"\nFișierul {filename} a fost generat cu {total} înregistrări (format columnar).")
+        if unique:
+            print_allocator_stats(allocator.stats())
+    return allocator.stats() if unique else None
+
+
+def is_columnar_file(filename):
+
+    with open(filename, mode="rb") as f:
+        return f.read(len(COLUMNAR_MAGIC)) == COLUMNAR_MAGIC
+
+
+class ColumnarDataset:
+    def __init__(self, filename="cnp_data.col"):
+        with open(filename, mode="rb") as f:
+            magic, version, rows, schema_offset, schema_length = COLUMNAR_HEADER.unpack(
+                f.read(COLUMNAR_HEADER.size))
+            if magic != COLUMNAR_MAGIC or version != 1:
+                raise ValueError(f"{filename} nu este un fișier columnar CNP valid.")
+            f.seek(schema_offset)
+            schema = json.loads(f.read(schema_length).decode("utf-8"))
+        self.filename = filename
+        self.rows = rows
+        self.columns = {column["name"]: column for column in schema["columns"]}
+        self.names = self.columns["Nume"]["dictionary"]
+
+    def column(self, name, mmap=False):
+        import numpy as np
+
+        column = self.columns[name]
+        if mmap:
+            return np.memmap(self.filename, dtype=column["dtype"], mode="r", offset=column["offset"],
+                             shape=(self.rows,))
+        return np.fromfile(self.filename, dtype=column["dtype"], count=self.rows, offset=column["offset"])
+
+    def iter_chunks(self, chunk_size=100_000):
+        # (CNP-uri ca int, nume) pe blocuri, din coloanele mapate în memorie.
+        cnps = self.column("CNP", mmap=True)
+        name_ids = self.column("Nume", mmap=True)
+        names = self.names
+        for start in range(0, self.rows, chunk_size):
+            yield (cnps[start:start + chunk_size].tolist(),
+                   list(map(names.__getitem__, name_ids[start:start + chunk_size].tolist())))
+
+    def __len__(self):
+        return self.rows
+
+
+FIBONACCI_MULTIPLIER = 0x9E3779B97F4A7C15
+MASK64 = (1 << 64) - 1
+
+
+# Strategii de hash: fiecare primește cheia (CNP ca șir) și întoarce un întreg
+# pe 64 de biți; tabelul aplică apoi modulo numărul de bucket-uri.
+FNV_OFFSET = 0xCBF29CE484222325
+FNV_PRIME = 0x100000001B3
+
+
+def hash_ord_sum(key):
+
+    return sum(ord(ch) for ch in key)
+
+
+def hash_digit_sum(key):
+
+    return sum(int(digit) for digit in str(key))
+
+
+def hash_multiplicative(key):
+
+    return (int(key) * FIBONACCI_MULTIPLIER) & MASK64
+
+
+def hash_fnv1a(key):
+
+    h = FNV_OFFSET
+    for byte in key.encode():
+        h = ((h ^ byte) * FNV_PRIME) & MASK64
+    return h
+
+
+def hash_siphash(key):
+
+    # hash() pentru str folosește SipHash și este randomizat per proces
+    # (vezi PYTHONHASHSEED), deci distribuția nu e reproductibilă între rulări.
+    return hash(key) & MASK64
+
+
+def mix64(h):
+
+    # finalizatorul splitmix64
+    h = ((h ^ (h >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    h = ((h ^ (h >> 27)) * 0x94D049BB133111EB) & MASK64
+    return h ^ (h >> 31)
+
+
+def hash_cnp_fields(key):
+
+    # Câmpurile CNP-ului (S AA LL ZZ JJ NNN C) sunt compactate într-un singur
+    # întreg fără goluri, apoi amestecate. Cifra de control nu aduce entropie.
+    sex = int(key[0])
+    year, month, day = int(key[1:3]), int(key[3:5]), int(key[5:7])
+    judet, nnn = int(key[7:9]), int(key[9:12])
+    date = (year * 12 + month - 1) * 31 + day - 1
+    return mix64((((sex * 37200 + date) * 100 + judet) * 1000) + nnn)
+
+
+HASH_STRATEGIES = {
+    "ord_sum": hash_ord_sum,
+    "digit_sum": hash_digit_sum,
+    "multiplicative": hash_multiplicative,
+    "fnv1a": hash_fnv1a,
+    "siphash": hash_siphash,
+    "cnp_fields": hash_cnp_fields,
+}
+
+
+def resolve_hash_strategy(strategy):
+
+    if callable(strategy):
+        return strategy
+    try:
+        return HASH_STRATEGIES[strategy]
+    except KeyError:
+        raise ValueError(f"Strategie de hash necunoscută: {strategy!r} "
+                         f"(disponibile: {', '.join(HASH_STRATEGIES)})") from None
+
+
+def bucket_stats(buckets):
+
+    histogram = Counter(len(bucket) if bucket else 0 for bucket in buckets)
+    entries = sum(length * n for length, n in histogram.items())
+    occupied = len(buckets) - histogram.get(0, 0)
+    return {
+        "buckets": len(buckets),
+        "entries": entries,
+        "occupied_buckets": occupied,
+        "load_factor": entries / len(buckets) if buckets else 0.0,
+        "max_chain": max(histogram) if histogram else 0,
+        "mean_chain": entries / occupied if occupied else 0.0,
+        "chain_histogram": dict(sorted(histogram.items())),
+    }
+
+
+class ProbeCounter:
+    def __init__(self):
+        self.searches = 0
+        self.total_probes = 0
+        self.max_probes = 0
+        self.histogram = Counter()
+
+    def record(self, iterations):
+        self.searches += 1
+        self.total_probes += iterations
+        if iterations > self.max_probes:
+            self.max_probes = iterations
+        self.histogram[iterations] += 1
+
+    def record_many(self, iterations):
+        import numpy as np
+
+        if len(iterations) == 0:
+            return
+        self.searches += len(iterations)
+        self.total_probes += int(iterations.sum())
+        self.max_probes = max(self.max_probes, int(iterations.max()))
+        counts = np.bincount(iterations)
+        for probes in np.flatnonzero(counts):
+            self.histogram[int(probes)] += int(counts[probes])
+
+    def merge(self, other):
+        self.searches += other.searches
+        self.total_probes += other.total_probes
+        self.max_probes = max(self.max_probes, other.max_probes)
+        self.histogram.update(other.histogram)
+
+    def as_dict(self):
+        return {
+            "searches": self.searches,
+            "total_probes": self.total_probes,
+            "mean_probes": self.total_probes / self.searches if self.searches else 0.0,
+            "max_probes": self.max_probes,
+            "probe_histogram": dict(sorted(self.histogram.items())),
+        }
+
+
+def print_table_stats(stats):
+
+    print("\n--- Statistici Hash Table ---")
+    for name, value in stats.items():
+        if isinstance(value, float):
+            value = f"{value:.2f}"
+        print(f"{name}: {value}")
+
+
+def is_prime(n):
+
+    if n < 2:
+        return False
+    if n % 2 == 0:
+        return n == 2
+    i = 3
+    while i * i <= n:
+        if n % i == 0:
+            return False
+        i += 2
+    return True
+
+
+def next_prime(n):
+
+    while not is_prime(n):
+        n += 1
+    return n
+
+
+# Filtru Bloom scalabil: fiecare strat are un număr de biți și de funcții de
+# hash calculate din capacitatea lui și rata de fals pozitive dorită. Când un
+# strat se umple se adaugă altul, de două ori mai mare și cu rata înjumătățită,
+# deci rata totală rămâne sub fp_rate * 2 oricât ar crește tabelul.
+# Pozițiile vin prin dublu hashing din două CRC32 (cod C, deterministe), nu din
+# hash(), care e randomizat per proces: filtrul rămâne valid după pickle.
+BLOOM_CRC_SEED = 0x9E3779B9
+
+
+class BloomFilter:
+    def __init__(self, capacity=1_000_000, fp_rate=0.01):
+        self.fp_rate = fp_rate
+        self.layers = []
+        self.count = 0
+        self.rejected = 0
+        self.passed = 0
+        self._add_layer(max(1, capacity), fp_rate / 2)
+
+    def _add_layer(self, capacity, fp_rate):
+        bits = max(64, math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2))
+        hashes = max(1, round(bits / capacity * math.log(2)))
+        self.layers.append([bytearray((bits + 7) // 8), bits, hashes, capacity, 0, fp_rate])
+
+    def _hashes(self, key):
+        data = key.encode("utf-8")
+        h = zlib.crc32(data) | zlib.crc32(data, BLOOM_CRC_SEED) << 32
+        return mix64(h), mix64(h ^ FIBONACCI_MULTIPLIER) | 1
+
+    def add(self, key):
+        layer = self.layers[-1]
+        if layer[4] >= layer[3]:
+            self._add_layer(layer[3] * 2, layer[5] / 2)
+            layer = self.layers[-1]
+        bitmap, bits, hashes = layer[0], layer[1], layer[2]
+        h1, h2 = self._hashes(key)
+        for i in range(hashes):
+            pos = (h1 + i * h2) % bits
+            bitmap[pos >> 3] |= 1 << (pos & 7)
+        layer[4] += 1
+        self.count += 1
+
+    def __contains__(self, key):
+        h1, h2 = self._hashes(key)
+        for bitmap, bits, hashes, _, _, _ in self.layers:
+            for i in range(hashes):
+                pos = (h1 + i * h2) % bits
+                if not bitmap[pos >> 3] >> (pos & 7) & 1:
+                    break
+            else:
+                return True
+        return False
+
+    def might_contain(self, key):
+        if key in self:
+            self.passed += 1
+            return True
+        self.rejected += 1
+        return False
+
+    def memory_usage(self):
+        return sum(len(layer[0]) for layer in self.layers)
+
+
+# Valori codificate prin dicționar: fiecare nume distinct apare o singură dată
+# în names, iar bucket-urile tabelului țin doar id-ul numelui. Pentru indexul
+# inversat, fiecare rând inserat își păstrează CNP-ul ca întreg în row_cnps, iar
+# nume -> rânduri este câte un array('I') per nume, actualizat la fiecare add,
+# deci "toți cei cu numele X" nu parcurge tabelul.
+class NameStore:
+    def __init__(self):
+        self.names = []
+        self.name_ids = {}
+        self.row_cnps = array('Q')
+        self.postings = []
+
+    def intern(self, name):
+        vid = self.name_ids.get(name)
+        if vid is None:
+            vid = len(self.names)
+            self.name_ids[name] = vid
+            self.names.append(name)
+            self.postings.append(array('I'))
+        return vid
+
+    def add(self, cnp, name):
+        vid = self.intern(name)
+        self.postings[vid].append(len(self.row_cnps))
+        self.row_cnps.append(int(cnp))
+        return vid
+
+    def cnp(self, row):
+        return f"{self.row_cnps[row]:013d}"
+
+    def rows_named(self, name):
+        vid = self.name_ids.get(name)
+        return self.postings[vid] if vid is not None else array('I')
+
+    def count_named(self, name):
+        return len(self.rows_named(name))
+
+    def find_by_name(self, name, limit=None, offset=0):
+        # CNP-urile rândurilor cu numele dat, în ordinea inserării.
+        rows = self.rows_named(name)
+        stop = len(rows) if limit is None else min(len(rows), offset + limit)
+        return [self.cnp(row) for row in rows[offset:stop]]
+
+    def __len__(self):
+        return len(self.row_cnps)
+
+    def memory_usage(self):
+        # Partea de valori: tabela de nume și indexul inversat (CNP-uri și rânduri per nume).
+        names = sum(sys.getsizeof(name) for name in self.names) + sys.getsizeof(self.name_ids)
+        postings = sum(p.itemsize * len(p) for p in self.postings)
+        return {"names": names, "postings": postings, "row_cnps": self.row_cnps.itemsize * len(self.row_cnps)}
+
+
+# Redimensionare incrementală, ca în dict-ul din Redis: când factorul de
+# încărcare depășește max_load se alocă un tabel de ~2x, iar fiecare insert și
+# search mută încă rehash_step bucket-uri. Cât timp migrarea e în curs, insert
+# scrie în tabelul nou și search consultă întâi tabelul vechi, apoi pe cel nou.
+# Bucket-urile goale sunt None, ca alocarea unui tabel nou să nu creeze
+# milioane de liste (ar fi ea însăși o pauză stop-the-world).
+# Din același motiv bucket-urile stau în segmente de SEGMENT_SIZE: un tabel
+# nou este doar directorul lui (None pentru segmentele nealocate), un segment
+# se alocă la prima scriere în el, iar migrarea eliberează segmentele vechi pe
+# măsură ce le golește. Nici începutul, nici sfârșitul unei redimensionări nu
+# mai parcurg toate bucket-urile.
+EMPTY_BUCKET = ()
+SEGMENT_BITS = 11
+SEGMENT_SIZE = 1 << SEGMENT_BITS
+SEGMENT_MASK = SEGMENT_SIZE - 1
+EMPTY_SEGMENT = (None,) * SEGMENT_SIZE
+
+
+def new_segments(size):
+
+    return [None] * -(-size // SEGMENT_SIZE)
+
 
 class HashTable:
-    def __init__(self, size=1000003):
+    def __init__(self, size=1000003, hash_strategy="ord_sum", max_load=1.0, rehash_step=4, bloom_fp_rate=None,
+                 bloom_capacity=None, encode_values=False, track_probes=False):
         self.size = size
-        self.table = [[] for _ in range(self.size)]
+        self.table = new_segments(size)
+        self.hash_strategy = resolve_hash_strategy(hash_strategy)
+        # Histograma sondărilor costă cât jumătate de căutare, deci se ține doar la cerere.
+        self.probes = ProbeCounter() if track_probes else None
+        # Cu encode_values, bucket-urile țin (cheie, id nume) în loc de șirul
+        # numelui; id-urile mici sunt int-uri partajate, deci nu alocă nimic.
+        self.names = NameStore() if encode_values else None
+        # Filtrul Bloom opțional respinge cheile absente fără să atingă tabelul.
+        self.bloom = BloomFilter(bloom_capacity or size, bloom_fp_rate) if bloom_fp_rate else None
+        self.bloom_hits = 0
+        self.bloom_false_positives = 0
+        self.count = 0
+        self.max_load = max_load
+        self.rehash_step = rehash_step
+        self.new_table = None
+        self.new_size = 0
+        self.rehash_index = 0
 
     def hash_function(self, key):
 
-        return sum(ord(ch) for ch in key) % self.size
+        return self.hash_strategy(key) % self.size
+
+    def rehashing(self):
+        return self.new_table is not None
+
+    def _start_resize(self):
+        self.new_size = next_prime(self.size * 2 + 1)
+        self.new_table = new_segments(self.new_size)
+        self.rehash_index = 0
+        if not self.rehash_step:
+            self._migrate(self.size)
+
+    def _migrate(self, buckets):
+        # Ca în Redis, se vizitează cel mult 10 bucket-uri goale per bucket mutat,
+        # ca un pas să rămână ieftin chiar dacă tabelul vechi e rar populat.
+        empty_visits = buckets * 10
+        table, new_table, new_size, strategy = self.table, self.new_table, self.new_size, self.hash_strategy
+        while buckets > 0 and self.rehash_index < self.size:
+            position = self.rehash_index
+            segment = table[position >> SEGMENT_BITS]
+            if segment is None:
+                # Segment nealocat: nimic de mutat, se sare peste el întreg.
+                self.rehash_index = (position | SEGMENT_MASK) + 1
+                empty_visits -= 1
+            else:
+                offset = position & SEGMENT_MASK
+                bucket = segment[offset]
+                if bucket:
+                    # Intrările mutate sunt mai vechi decât tot ce s-a inserat direct în
+                    # tabelul nou, deci trec în fața lanțului, în ordinea lor, și search
+                    # găsește tot prima înregistrare inserată. Se grupează după bucket-ul
+                    # nou și fiecare grup se lipește o singură dată: un insert(0, ...) per
+                    # intrare ar fi pătratic pe lanțurile lungi ale unui hash slab.
+                    moved = {}
+                    for entry in bucket:
+                        index = strategy(entry[0]) % new_size
+                        group = moved.get(index)
+                        if group is None:
+                            moved[index] = [entry]
+                        else:
+                            group.append(entry)
+                    for index, group in moved.items():
+                        target_segment = new_table[index >> SEGMENT_BITS]
+                        if target_segment is None:
+                            target_segment = new_table[index >> SEGMENT_BITS] = [None] * SEGMENT_SIZE
+                        target = target_segment[index & SEGMENT_MASK]
+                        if target is None:
+                            target_segment[index & SEGMENT_MASK] = group
+                        else:
+                            target[0:0] = group
+                    segment[offset] = None
+                    buckets -= 1
+                else:
+                    empty_visits -= 1
+                self.rehash_index += 1
+                if offset == SEGMENT_MASK:
+                    table[position >> SEGMENT_BITS] = None
+            if empty_visits == 0:
+                break
+        if self.rehash_index >= self.size:
+            self.table, self.size = self.new_table, self.new_size
+            self.new_table, self.new_size, self.rehash_index = None, 0, 0
+
+    def prehash(self, key):
+        return self.hash_strategy(key)
+
+    def insert_prehashed(self, h, key, value):
+        if self.new_table is not None:
+            self._migrate(self.rehash_step)
+        elif self.max_load and self.count >= self.size * self.max_load:
+            self._start_resize()
+        if self.new_table is not None:
+            table, index = self.new_table, h % self.new_size
+        else:
+            table, index = self.table, h % self.size
+        if self.names is not None:
+            value = self.names.add(key, value)
+        segment = table[index >> SEGMENT_BITS]
+        if segment is None:
+            segment = table[index >> SEGMENT_BITS] = [None] * SEGMENT_SIZE
+        index &= SEGMENT_MASK
+        bucket = segment[index]
+        if bucket is None:
+            segment[index] = [(key, value)]
+        else:
+            bucket.append((key, value))
+        self.count += 1
+        if self.bloom is not None:
+            self.bloom.add(key)
 
     def insert(self, key, value):
-        index = self.hash_function(key)
-        self.table[index].append((key, value))
+        self.insert_prehashed(self.hash_strategy(key), key, value)
 
     def search(self, key):
-        index = self.hash_function(key)
+        # Respingerea Bloom vine prima: o cheie absentă nu plătește nici pasul de migrare.
+        if self.bloom is not None and not self.bloom.might_contain(key):
+            if self.probes is not None:
+                self.probes.record(0)
+            return None, 0
+        if self.new_table is not None:
+            self._migrate(self.rehash_step)
+        value, iterations = self._search_chains(key)
+        if self.probes is not None:
+            self.probes.record(iterations)
+        if self.bloom is not None:
+            if value is None:
+                self.bloom_false_positives += 1
+            else:
+                self.bloom_hits += 1
+        if value is not None and self.names is not None:
+            value = self.names.names[value]
+        return value, iterations
+
+    def find_by_name(self, name, limit=None, offset=0):
+        if self.names is None:
+            raise ValueError("Căutarea după nume cere un tabel creat cu encode_values=True.")
+        return self.names.find_by_name(name, limit, offset)
+
+    def _search_chains(self, key):
+        h = self.hash_strategy(key)
         iterations = 0
-        for entry in self.table[index]:
+        index = h % self.size
+        for entry in (self.table[index >> SEGMENT_BITS] or EMPTY_SEGMENT)[index & SEGMENT_MASK] or EMPTY_BUCKET:
             iterations += 1
             if entry[0] == key:
                 return entry[1], iterations
+        if self.new_table is not None:
+            index = h % self.new_size
+            for entry in (self.new_table[index >> SEGMENT_BITS] or EMPTY_SEGMENT)[index & SEGMENT_MASK] or EMPTY_BUCKET:
+                iterations += 1
+                if entry[0] == key:
+                    return entry[1], iterations
         return None, iterations
 
+    def buckets(self):
+        # Toate bucket-urile (None pentru cele goale): ale tabelului vechi, apoi ale celui nou.
+        for table, size in ((self.table, self.size), (self.new_table, self.new_size)):
+            if table is not None:
+                yield from islice(chain.from_iterable(segment or EMPTY_SEGMENT for segment in table), size)
+
+    def stats(self):
+        stats = bucket_stats(list(self.buckets()))
+        stats["hash_strategy"] = self.hash_strategy.__name__
+        stats["rehashing"] = self.new_table is not None
+        if self.probes is not None:
+            stats.update(self.probes.as_dict())
+        if self.bloom is not None:
+            stats["bloom_rejected"] = self.bloom.rejected
+            stats["bloom_hits"] = self.bloom_hits
+            stats["bloom_false_positives"] = self.bloom_false_positives
+            passed_misses = self.bloom_false_positives + self.bloom.rejected
+            stats["bloom_false_positive_rate"] = self.bloom_false_positives / passed_misses if passed_misses else 0.0
+            stats["bloom_bytes"] = self.bloom.memory_usage()
+        if self.names is not None:
+            stats["distinct_values"] = len(self.names.names)
+            stats.update({f"value_{part}_bytes": size for part, size in self.names.memory_usage().items()})
+        return stats
+
+
+def insert_latency_benchmark(total=20_000_000, start_size=1000003, rehash_step=4, hash_strategy="multiplicative",
+                             seed=0, weak_total=200_000, weak_start_size=1009):
+
+    # Măsoară latența fiecărui insert în timp ce tabelul crește; rehash_step=0
+    # dă varianta stop-the-world, pentru comparație. Al doilea caz crește un
+    # tabel cu ord_sum, al cărui hash are doar ~120 de valori, deci fiecare
+    # migrare mută lanțuri de mii de intrări.
+    report = measure_insert_latency(total, start_size, rehash_step, hash_strategy, seed)
+    if weak_total:
+        report["weak_hash"] = measure_insert_latency(weak_total, weak_start_size, rehash_step, "ord_sum", seed)
+    return report
+
+
+def measure_insert_latency(total, start_size, rehash_step, hash_strategy, seed):
+
+    # GC-ul ciclic e oprit pe durata măsurătorii ca pauzele lui să nu fie
+    # atribuite redimensionării.
+    rng = random.Random(seed)
+    ht = HashTable(start_size, hash_strategy, rehash_step=rehash_step)
+    latencies = array('d')
+    clock = time.perf_counter
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(total):
+            cnp = str(rng.randrange(10 ** 12, 10 ** 13))
+            t0 = clock()
+            ht.insert(cnp, "")
+            latencies.append(clock() - t0)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    ordered = sorted(latencies)
+    report = {
+        "inserts": total,
+        "hash_strategy": ht.hash_strategy.__name__,
+        "rehash_step": rehash_step,
+        "final_size": ht.size,
+        "p50_us": ordered[len(ordered) // 2] * 1e6,
+        "p99_us": ordered[int(len(ordered) * 0.99)] * 1e6,
+        "p999_us": ordered[int(len(ordered) * 0.999)] * 1e6,
+        "max_us": ordered[-1] * 1e6,
+    }
+    print(f"\n{report['hash_strategy']}, rehash_step={rehash_step}: {total} inserări, mărime finală {ht.size}, "
+          f"p99 {report['p99_us']:.1f} µs, max {report['max_us']:.1f} µs")
+    return report
+
+
+# Tabel compact cu adresare deschisă: cheile (CNP-uri de 13 cifre) sunt ținute
+# ca întregi pe 64 de biți într-un array plat, iar valorile ca indici într-o
+# listă de valori distincte. Coliziunile se rezolvă prin sondare liniară.
+EMPTY_SLOT = 0
+
+
+def cnp_to_int(key):
+
+    if len(key) != 13 or not key.isdigit():
+        raise ValueError(f"Cheie invalidă (se așteaptă 13 cifre): {key!r}")
+    # +1 ca valoarea 0 să rămână rezervată pentru sloturile goale
+    return int(key) + 1
+
+
+def int_to_cnp(packed):
+
+    return f"{packed - 1:013d}"
+
+
+class CompactHashTable:
+    def __init__(self, size=1 << 21, max_load=0.7, track_probes=False):
+        capacity = 8
+        while capacity < size:
+            capacity <<= 1
+        self.max_load = max_load
+        self.count = 0
+        self.value_list = []
+        self.value_ids = {}
+        self.probes = ProbeCounter() if track_probes else None
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        self.size = capacity
+        self.mask = capacity - 1
+        self.shift = 64 - (capacity.bit_length() - 1)
+        self.keys = array('Q', bytes(8 * capacity))
+        self.values = array('I', bytes(4 * capacity))
+
+    def hash_function(self, packed):
+
+        return ((packed * FIBONACCI_MULTIPLIER) & MASK64) >> self.shift
+
+    def _value_id(self, value):
+        vid = self.value_ids.get(value)
+        if vid is None:
+            vid = len(self.value_list)
+            self.value_ids[value] = vid
+            self.value_list.append(value)
+        return vid
+
+    def _place(self, packed, vid):
+        keys = self.keys
+        mask = self.mask
+        index = self.hash_function(packed)
+        while True:
+            current = keys[index]
+            if current == EMPTY_SLOT:
+                keys[index] = packed
+                self.values[index] = vid
+                self.count += 1
+                return True
+            if current == packed:
+                # La fel ca în HashTable, search întoarce prima înregistrare
+                # inserată, deci duplicatele nu suprascriu valoarea existentă.
+                return False
+            index = (index + 1) & mask
+
+    def _grow(self):
+        old_keys = self.keys
+        old_values = self.values
+        self._allocate(self.size * 2)
+        self.count = 0
+        for packed, vid in zip(old_keys, old_values):
+            if packed != EMPTY_SLOT:
+                self._place(packed, vid)
+
+    def prehash(self, key):
+        # Slotul de origine depinde de capacitate, care se poate schimba la
+        # _grow, deci pre-hash-ul este doar cheia împachetată.
+        return cnp_to_int(key)
+
+    def insert_prehashed(self, packed, key, value):
+        if self.count + 1 > self.size * self.max_load:
+            self._grow()
+        return self._place(packed, self._value_id(value))
+
+    def insert(self, key, value):
+        return self.insert_prehashed(cnp_to_int(key), key, value)
+
+    def search(self, key):
+        # Calea fierbinte: validarea, împachetarea și hash-ul sunt scrise inline
+        # (un apel de funcție în plus costă cât câteva sondări), iar potrivirea
+        # se verifică înaintea slotului gol, pentru că o cheie găsită iese de
+        # obicei chiar la prima sondare.
+        if len(key) != 13 or not key.isdigit():
+            return None, 0
+        packed = int(key) + 1
+        keys = self.keys
+        mask = self.mask
+        index = ((packed * FIBONACCI_MULTIPLIER) & MASK64) >> self.shift
+        iterations = 1
+        current = keys[index]
+        while current != packed:
+            if not current:  # EMPTY_SLOT
+                iterations -= 1
+                if self.probes is not None:
+                    self.probes.record(iterations)
+                return None, iterations
+            index = (index + 1) & mask
+            iterations += 1
+            current = keys[index]
+        if self.probes is not None:
+            self.probes.record(iterations)
+        return self.value_list[self.values[index]], iterations
+
+    def search_many(self, keys):
+        import numpy as np
+
+        packed, valid = cnp_batch_to_int(keys)
+        vids, found, iterations = probe_many(np.frombuffer(self.keys, dtype=np.uint64),
+                                             np.frombuffer(self.values, dtype=np.uint32),
+                                             self.mask, self.shift, packed, valid)
+        if self.probes is not None:
+            self.probes.record_many(iterations)
+        # vid -1 cade pe ultimul element, adică None pentru cheile negăsite
+        names = np.array(self.value_list + [None], dtype=object)
+        return names[vids], found, iterations
+
+    def stats(self):
+        # Lungimea sondării pentru o cheie existentă = distanța față de slotul
+        # de origine + 1; echivalentul lungimii lanțului din HashTable.
+        histogram = Counter()
+        for index, packed in enumerate(self.keys):
+            if packed != EMPTY_SLOT:
+                histogram[((index - self.hash_function(packed)) & self.mask) + 1] += 1
+        stats = {
+            "buckets": self.size,
+            "entries": self.count,
+            "occupied_buckets": self.count,
+            "load_factor": self.count / self.size,
+            "max_chain": max(histogram) if histogram else 0,
+            "mean_chain": sum(k * n for k, n in histogram.items()) / self.count if self.count else 0.0,
+            "chain_histogram": dict(sorted(histogram.items())),
+            "hash_strategy": "fibonacci",
+        }
+        if self.probes is not None:
+            stats.update(self.probes.as_dict())
+        return stats
+
+    def memory_usage(self):
+
+        slots = self.keys.itemsize * len(self.keys) + self.values.itemsize * len(self.values)
+        heap = sum(sys.getsizeof(v) for v in self.value_list)
+        return slots + heap + sys.getsizeof(self.value_ids) + sys.getsizeof(self.value_list)
+
+
+# Căutare în lot: tot lotul este împachetat și hash-uit vectorizat, sortat după
+# slotul de origine (sondările vecine ating aceleași linii de cache), apoi
+# sondat în pași paraleli până când fiecare cheie atinge potrivirea sau un slot gol.
+def digits_to_int(digits):
+    import numpy as np
+
+    # 10^13 < 2^53, deci produsul în float64 (prin BLAS) este exact.
+    powers = 10.0 ** np.arange(digits.shape[1] - 1, -1, -1)
+    return (digits.astype(np.float64) @ powers).astype(np.uint64)
+
+
+def cnp_batch_to_int(keys):
+    import numpy as np
+
+    if isinstance(keys, list) and keys and isinstance(keys[0], str):
+        # Calea rapidă pentru o listă de CNP-uri corecte: un singur buffer
+        # "c1,c2,...,cn," citit ca matrice n x 14. Dacă fiecare rând are 13 cifre
+        # urmate de virgulă, lungimea totală garantează că nicio cheie nu a fost
+        # mai scurtă, mai lungă sau nu conținea virgule.
+        joined = ",".join(keys) + ","
+        if len(joined) == 14 * len(keys) and joined.isascii():
+            raw = np.frombuffer(joined.encode("ascii"), dtype=np.uint8).reshape(-1, 14)
+            digits = raw[:, :13] - np.uint8(ord("0"))
+            if (raw[:, 13] == ord(",")).all() and (digits <= 9).all():
+                return digits_to_int(digits) + np.uint64(1), np.ones(len(keys), dtype=bool)
+
+    keys = np.asarray(keys)
+    packed = np.zeros(len(keys), dtype=np.uint64)
+    if keys.dtype.kind in "iu":
+        valid = (keys >= 0) & (keys < 10 ** 13)
+        packed[valid] = keys[valid].astype(np.uint64) + np.uint64(1)
+    else:
+        # Cifrele se citesc direct din codurile UCS-4 ale șirurilor, fără
+        # conversia lentă str -> int element cu element.
+        keys = keys.astype(str)
+        valid = np.char.str_len(keys) == 13
+        digits = keys[valid].astype("U13").view(np.uint32).reshape(-1, 13) - np.uint32(ord("0"))
+        digit_ok = (digits <= 9).all(axis=1)
+        valid[valid] = digit_ok
+        packed[valid] = digits_to_int(digits[digit_ok]) + np.uint64(1)
+    return packed, valid
+
 
-def populate_hash_table(csv_filename="cnp_data.csv"):
-    ht = HashTable()
+def probe_many(slot_keys, slot_values, mask, shift, packed, valid):
+    import numpy as np
+
+    home = (packed * np.uint64(FIBONACCI_MULTIPLIER)) >> np.uint64(shift)
+    order = np.argsort(home)
+    slots = home[order].astype(np.int64)
+    target = packed[order]
+
+    # Sondarea lucrează în ordinea sortată; rezultatele sunt readuse la
+    # ordinea cererilor la final.
+    n = len(packed)
+    vids = np.full(n, -1, dtype=np.int64)
+    iterations = np.zeros(n, dtype=np.int64)
+    active = np.flatnonzero(valid[order])
+    slots, target = slots[active], target[active]
+    while active.size:
+        current = slot_keys[slots]
+        occupied = current != EMPTY_SLOT
+        hit = current == target
+        iterations[active] += occupied
+        vids[active[hit]] = slot_values[slots[hit]]
+        more = occupied & ~hit
+        active = active[more]
+        slots = (slots[more] + 1) & mask
+        target = target[more]
+
+    result_vids = np.empty_like(vids)
+    result_iterations = np.empty_like(iterations)
+    result_vids[order] = vids
+    result_iterations[order] = iterations
+    return result_vids, result_vids >= 0, result_iterations
+
+
+def search_summary(found, iterations):
+
+    # Acceptă atât liste Python, cât și array-urile întoarse de search_many.
+    if hasattr(iterations, "sum"):
+        total_iterations, max_iterations, found_count = iterations.sum(), iterations.max(initial=0), found.sum()
+    else:
+        total_iterations, max_iterations, found_count = sum(iterations), max(iterations, default=0), sum(found)
+    searches = len(iterations)
+    return {
+        "searches": searches,
+        "found": int(found_count),
+        "total_iterations": int(total_iterations),
+        "mean_iterations": int(total_iterations) / searches if searches else 0.0,
+        "max_iterations": int(max_iterations),
+    }
+
+
+def populate_hash_table(csv_filename="cnp_data.csv", table_cls=HashTable):
+    ht = table_cls()
+    if is_columnar_file(csv_filename):
+        # Fără parsare de text: CNP-urile vin direct ca întregi din coloană.
+        # CompactHashTable primește cheia deja împachetată (CNP + 1, ca în cnp_to_int).
+        compact = isinstance(ht, CompactHashTable)
+        inserted = 0
+        for cnps, names in ColumnarDataset(csv_filename).iter_chunks():
+            if compact:
+                for cnp, full_name in zip(cnps, names):
+                    ht.insert_prehashed(cnp + 1, None, full_name)
+            else:
+                for cnp, full_name in zip(cnps, names):
+                    ht.insert(f"{cnp:013d}", full_name)
+            inserted += len(cnps)
+            print(f"{inserted} înregistrări inserate în hash table...")
+        print(f"\nHash table populat cu {inserted} înregistrări din {csv_filename}.")
+        return ht
     with open(csv_filename, mode="r") as csvfile:
         reader = csv.reader(csvfile)
         next(reader)
@@ -107,35 +1263,500 @@ def populate_hash_table(csv_filename="cnp_data.csv"):
     return ht
 
 
-def random_searches(hash_table, csv_filename="cnp_data.csv", searches=1000):
+# Decodarea câmpurilor din CNP: S AA LL ZZ JJ NNN C. Prima cifră dă sexul și
+# secolul (7/8 sunt rezidenți, 9 cetățeni străini, considerați aici din 1900).
+SEX_CENTURY = {
+    "1": ("M", 1900), "2": ("F", 1900),
+    "3": ("M", 1800), "4": ("F", 1800),
+    "5": ("M", 2000), "6": ("F", 2000),
+    "7": ("M", 1900), "8": ("F", 1900),
+    "9": (None, 1900),
+}
+
+
+def decode_cnp(cnp):
+
+    try:
+        sex, century = SEX_CENTURY[cnp[0]]
+        return {
+            "sex": sex,
+            "sex_digit": int(cnp[0]),
+            "birth_date": datetime.date(century + int(cnp[1:3]), int(cnp[3:5]), int(cnp[5:7])),
+            "county": int(cnp[7:9]),
+            "sequence": int(cnp[9:12]),
+            "control": int(cnp[12]),
+        }
+    except (KeyError, IndexError, ValueError):
+        raise ValueError(f"CNP nedecodabil: {cnp!r}") from None
+
+
+def as_date_key(value, end=False):
+
+    # Acceptă datetime.date sau un an întreg; întoarce cheia AAAALLZZ.
+    if isinstance(value, int):
+        return value * 10000 + (1231 if end else 101)
+    return value.year * 10000 + value.month * 100 + value.day
+
+
+# Indexuri secundare pe câmpurile codificate în CNP. Fiecare rând primește un
+# id (ordinea de încărcare); coloanele sunt array-uri compacte, iar după
+# finalize() există: județ -> id-uri (CSR), coloana de date sortată pentru
+# intervale și câte un bitmap de rânduri pentru fiecare cifră de sex/secol.
+class CNPFieldIndex:
+    def __init__(self):
+        self.cnps = array('Q')
+        self.dates = array('I')
+        self.counties = array('B')
+        self.sex_digits = array('B')
+        self.finalized = False
 
-    cnp_list = []
+    def add(self, cnp):
+        sex, century = SEX_CENTURY[cnp[0]]
+        self.cnps.append(cnp_to_int(cnp))
+        self.dates.append((century + int(cnp[1:3])) * 10000 + int(cnp[3:7]))
+        self.counties.append(int(cnp[7:9]))
+        self.sex_digits.append(int(cnp[0]))
+        self.finalized = False
+
+    def add_many(self, cnps):
+        centuries = {digit: century for digit, (_, century) in SEX_CENTURY.items()}
+        self.cnps.extend([cnp_to_int(cnp) for cnp in cnps])
+        self.dates.extend([(centuries[cnp[0]] + int(cnp[1:3])) * 10000 + int(cnp[3:7]) for cnp in cnps])
+        self.counties.extend([int(cnp[7:9]) for cnp in cnps])
+        self.sex_digits.extend([int(cnp[0]) for cnp in cnps])
+        self.finalized = False
+
+    def __len__(self):
+        return len(self.cnps)
+
+    def finalize(self):
+        n = len(self.cnps)
+
+        # Sortare prin numărare după județ (coduri 00-99).
+        counts = [0] * 101
+        for county in self.counties:
+            counts[county + 1] += 1
+        for i in range(1, 101):
+            counts[i] += counts[i - 1]
+        self.county_offsets = array('I', counts)
+        fill = counts[:100]
+        county_rows = array('I', bytes(4 * n))
+        for row, county in enumerate(self.counties):
+            county_rows[fill[county]] = row
+            fill[county] += 1
+        self.county_rows = county_rows
+
+        dates = self.dates
+        self.date_order = array('I', sorted(range(n), key=dates.__getitem__))
+        self.sorted_dates = array('I', map(dates.__getitem__, self.date_order))
+
+        bitmaps = {digit: bytearray((n + 7) // 8) for digit in range(10)}
+        for row, digit in enumerate(self.sex_digits):
+            bitmaps[digit][row >> 3] |= 1 << (row & 7)
+        self.sex_bitmaps = bitmaps
+        self.finalized = True
+        return self
+
+    def rows_in_county(self, county):
+        return self.county_rows[self.county_offsets[county]:self.county_offsets[county + 1]]
+
+    def rows_born_between(self, born_from=None, born_to=None):
+        lo = 0 if born_from is None else bisect.bisect_left(self.sorted_dates, as_date_key(born_from))
+        hi = len(self.sorted_dates) if born_to is None else bisect.bisect_right(self.sorted_dates,
+                                                                                 as_date_key(born_to, end=True))
+        return self.date_order[lo:hi]
+
+    def sex_digit_set(self, sex=None, century=None):
+        return {int(digit) for digit, (s, c) in SEX_CENTURY.items()
+                if (sex is None or s == sex) and (century is None or c == century)}
+
+    def sex_bitmap(self, sex=None, century=None):
+        combined = 0
+        for digit in self.sex_digit_set(sex, century):
+            combined |= int.from_bytes(self.sex_bitmaps[digit], "little")
+        return combined.to_bytes(len(self.sex_bitmaps[0]), "little")
+
+    def count_sex(self, sex=None, century=None):
+        return int.from_bytes(self.sex_bitmap(sex, century), "little").bit_count()
+
+    def query(self, county=None, born_from=None, born_to=None, sex=None, century=None, limit=None):
+        if not self.finalized:
+            self.finalize()
+
+        # Candidații vin din indexul cel mai selectiv; restul condițiilor se
+        # verifică direct pe coloane, în O(1) per rând.
+        candidates = []
+        if county is not None:
+            candidates.append(self.rows_in_county(county))
+        if born_from is not None or born_to is not None:
+            candidates.append(self.rows_born_between(born_from, born_to))
+        bitmap = self.sex_bitmap(sex, century) if sex is not None or century is not None else None
+        if not candidates:
+            if bitmap is None:
+                rows = range(len(self))
+            else:
+                rows = (i * 8 + bit for i, byte in enumerate(bitmap) if byte for bit in range(8) if byte >> bit & 1)
+            ordered = True
+        else:
+            rows = min(candidates, key=len)
+            # Listele pe județ sunt deja în ordinea rândurilor; cele pe dată nu.
+            ordered = county is not None and rows is candidates[0]
+
+        date_lo = as_date_key(born_from) if born_from is not None else None
+        date_hi = as_date_key(born_to, end=True) if born_to is not None else None
+        result = []
+        for row in rows:
+            if county is not None and self.counties[row] != county:
+                continue
+            if date_lo is not None and self.dates[row] < date_lo:
+                continue
+            if date_hi is not None and self.dates[row] > date_hi:
+                continue
+            if bitmap is not None and not bitmap[row >> 3] >> (row & 7) & 1:
+                continue
+            result.append(row)
+            if ordered and limit is not None and len(result) >= limit:
+                break
+        if not ordered:
+            result.sort()
+        return result[:limit] if limit is not None else result
+
+    def cnp_at(self, row):
+        return int_to_cnp(self.cnps[row])
+
+    def memory_usage(self):
+        columns = [self.cnps, self.dates, self.counties, self.sex_digits]
+        if self.finalized:
+            columns += [self.county_offsets, self.county_rows, self.date_order, self.sorted_dates]
+        total = sum(col.itemsize * len(col) for col in columns)
+        if self.finalized:
+            total += sum(len(bitmap) for bitmap in self.sex_bitmaps.values())
+        return total
+
+
+# Eșantionare reservoir (algoritmul L): păstrează k chei uniform alese dintr-un
+# flux de lungime necunoscută, cu memorie O(k) și fără un număr aleator per rând.
+class Reservoir:
+    def __init__(self, k, rng=None):
+        self.k = k
+        self.rng = rng or random.Random()
+        self.items = []
+        self.seen = 0
+        self._w = 1.0
+        self._next = k
+        if k > 0:
+            self._advance()
+
+    def _advance(self):
+        self._w *= math.exp(math.log(1.0 - self.rng.random()) / self.k)
+        if self._w >= 1.0:
+            self._next = math.inf
+            return
+        skip = math.floor(math.log(1.0 - self.rng.random()) / math.log(1.0 - self._w))
+        self._next += skip + 1
+
+    def add(self, item):
+        if self.seen < self.k:
+            self.items.append(item)
+        elif self.seen == self._next - 1:
+            self.items[self.rng.randrange(self.k)] = item
+            self._advance()
+        self.seen += 1
+
+
+def stream_load(csv_filename="cnp_data.csv", searches=1000, table_cls=HashTable, chunk_size=10000, seed=None,
+                table=None, field_index=None):
+
+    # O singură trecere prin CSV: fiecare bloc de rânduri este parsat, apoi
+    # hash-uit, apoi inserat, iar cheile de căutare sunt eșantionate din același flux.
+    ht = table if table is not None else table_cls()
+    reservoir = Reservoir(searches, random.Random(seed))
+    timings = {"parse": 0.0, "hash": 0.0, "insert": 0.0}
+    rows = 0
+    with open(csv_filename, mode="r") as csvfile:
+        reader = csv.reader(csvfile)
+        next(reader)
+        while True:
+            t0 = time.perf_counter()
+            chunk = list(islice(reader, chunk_size))
+            t1 = time.perf_counter()
+            if not chunk:
+                break
+            hashes = [ht.prehash(row[0]) for row in chunk]
+            t2 = time.perf_counter()
+            for h, (cnp, full_name) in zip(hashes, chunk):
+                ht.insert_prehashed(h, cnp, full_name)
+            t3 = time.perf_counter()
+            if field_index is not None:
+                field_index.add_many([row[0] for row in chunk])
+            t4 = time.perf_counter()
+            for row in chunk:
+                reservoir.add(row[0])
+            timings["parse"] += t1 - t0
+            timings["hash"] += t2 - t1
+            timings["insert"] += t3 - t2
+            if field_index is not None:
+                timings["index"] = timings.get("index", 0.0) + t4 - t3
+            rows += len(chunk)
+            if rows % 100000 < chunk_size:
+                print(f"{rows} înregistrări inserate în hash table...")
+
+    print(f"\nHash table populat cu {rows} înregistrări într-o singură trecere.")
+    for stage, elapsed in timings.items():
+        rate = rows / elapsed if elapsed else float("inf")
+        print(f"  {stage}: {elapsed:.2f} s ({rate:,.0f} rânduri/s)")
+    if field_index is not None:
+        field_index.finalize()
+    return ht, reservoir.items, timings
+
+
+def sample_keys(csv_filename="cnp_data.csv", searches=1000, seed=None):
+    reservoir = Reservoir(searches, random.Random(seed))
     with open(csv_filename, mode="r") as csvfile:
         reader = csv.reader(csvfile)
         next(reader)
         for row in reader:
-            cnp_list.append(row[0])
+            reservoir.add(row[0])
+    return reservoir.items
+
+
+# Index persistent pe disc, citit prin mmap. Structura fișierului:
+#   antet (64 de octeți) | chei u64 × capacitate | id-uri de nume u32 × capacitate
+#   | offset-uri u32 × (nume distincte + 1) | heap cu numele în UTF-8
+# Cheile și sondarea sunt identice cu CompactHashTable, deci căutarea lucrează
+# direct pe paginile mapate, fără nicio parsare la deschidere.
+INDEX_MAGIC = b"CNPIDX01"
+INDEX_VERSION = 2
+INDEX_HEADER = struct.Struct("<8sIIQQQQQQ")
+INDEX_HEADER_SIZE = 64
+
+
+def source_signature(csv_filename):
+
+    # Mărimea și mtime-ul CSV-ului din care a fost construit indexul, păstrate
+    # în antet: un CSV regenerat nu mai corespunde și indexul se reconstruiește.
+    st = os.stat(csv_filename)
+    return st.st_size, st.st_mtime_ns
+
 
-    selected = random.sample(cnp_list, searches)
-    total_iterations = 0
-    found_count = 0
+def index_matches_source(index_filename="cnp_data.idx", csv_filename="cnp_data.csv"):
+    if not os.path.exists(index_filename) or not os.path.exists(csv_filename):
+        return False
+    with open(index_filename, mode="rb") as f:
+        header = f.read(INDEX_HEADER.size)
+    if len(header) < INDEX_HEADER.size:
+        return False
+    magic, version, *_, source_size, source_mtime = INDEX_HEADER.unpack(header)
+    return (magic == INDEX_MAGIC and version == INDEX_VERSION
+            and (source_size, source_mtime) == source_signature(csv_filename))
 
-    for cnp in selected:
-        value, iterations = hash_table.search(cnp)
-        total_iterations += iterations
-        if value is not None:
-            found_count += 1
 
-    average_iterations = total_iterations / searches
+def build_mmap_index(csv_filename="cnp_data.csv", index_filename="cnp_data.idx", table=None):
+    source_size, source_mtime = source_signature(csv_filename)
+    if table is None:
+        table = populate_hash_table(csv_filename, table_cls=CompactHashTable)
+
+    heap = bytearray()
+    offsets = array('I', [0])
+    for value in table.value_list:
+        heap += value.encode("utf-8")
+        offsets.append(len(heap))
+
+    keys = table.keys
+    values = table.values
+    if sys.byteorder != "little":
+        keys, values, offsets = array('Q', keys), array('I', values), array('I', offsets)
+        for arr in (keys, values, offsets):
+            arr.byteswap()
+
+    header = INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, len(table.value_list), table.size, table.count,
+                               INDEX_HEADER_SIZE + 12 * table.size + 4 * len(offsets), len(heap), source_size,
+                               source_mtime)
+    tmp_filename = index_filename + ".tmp"
+    with open(tmp_filename, mode="wb") as f:
+        f.write(header.ljust(INDEX_HEADER_SIZE, b"\0"))
+        keys.tofile(f)
+        values.tofile(f)
+        offsets.tofile(f)
+        f.write(heap)
+    os.replace(tmp_filename, index_filename)
+    print(f"\nIndexul {index_filename} a fost scris ({table.count} chei, {table.size} sloturi).")
+
+
+class MmapCNPIndex:
+    def __init__(self, index_filename="cnp_data.idx"):
+        self._file = open(index_filename, mode="rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, names, capacity, count, heap_offset, heap_length, source_size,
+         source_mtime) = INDEX_HEADER.unpack_from(self._mm)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            self.close()
+            raise ValueError(f"{index_filename} nu este un index CNP valid.")
+        if sys.byteorder != "little":
+            self.close()
+            raise ValueError("Indexul CNP poate fi mapat doar pe arhitecturi little-endian.")
+
+        self.size = capacity
+        self.count = count
+        self.mask = capacity - 1
+        self.shift = 64 - (capacity.bit_length() - 1)
+        view = memoryview(self._mm)
+        keys_end = INDEX_HEADER_SIZE + 8 * capacity
+        values_end = keys_end + 4 * capacity
+        self.keys = view[INDEX_HEADER_SIZE:keys_end].cast('Q')
+        self.values = view[keys_end:values_end].cast('I')
+        self.offsets = view[values_end:heap_offset].cast('I')
+        self._heap_offset = heap_offset
+        self._names = {}
+
+    def hash_function(self, packed):
+
+        return ((packed * FIBONACCI_MULTIPLIER) & MASK64) >> self.shift
+
+    def _name(self, vid):
+        name = self._names.get(vid)
+        if name is None:
+            start = self._heap_offset + self.offsets[vid]
+            end = self._heap_offset + self.offsets[vid + 1]
+            name = self._names[vid] = self._mm[start:end].decode("utf-8")
+        return name
+
+    def search(self, key):
+        try:
+            packed = cnp_to_int(key)
+        except ValueError:
+            return None, 0
+        keys = self.keys
+        mask = self.mask
+        index = self.hash_function(packed)
+        iterations = 0
+        while True:
+            current = keys[index]
+            if current == EMPTY_SLOT:
+                return None, iterations
+            iterations += 1
+            if current == packed:
+                return self._name(self.values[index]), iterations
+            index = (index + 1) & mask
+
+    def search_many(self, keys):
+        import numpy as np
+
+        packed, valid = cnp_batch_to_int(keys)
+        vids, found, iterations = probe_many(np.frombuffer(self.keys, dtype=np.uint64),
+                                             np.frombuffer(self.values, dtype=np.uint32),
+                                             self.mask, self.shift, packed, valid)
+        values = np.full(len(packed), None, dtype=object)
+        if found.any():
+            distinct, inverse = np.unique(vids[found], return_inverse=True)
+            values[found] = np.array([self._name(int(v)) for v in distinct], dtype=object)[inverse]
+        return values, found, iterations
+
+    def close(self):
+        for view in ("keys", "values", "offsets"):
+            if hasattr(self, view):
+                getattr(self, view).release()
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Căutare după prefix (ex. primele 7-9 cifre: sex + dată + județ). CNP-urile
+# distincte sunt ținute sortate ca întregi într-un array('Q'); toate CNP-urile
+# cu un prefix dat formează un interval contiguu [p * 10^r, (p + 1) * 10^r),
+# găsit cu două căutări binare, deci o interogare costă O(log n + limit).
+CNP_DIGITS = 13
+
+
+class PrefixIndex:
+    def __init__(self, pairs=()):
+        # La duplicate rămâne prima valoare, ca în search.
+        first = {}
+        for key, value in pairs:
+            first.setdefault(int(key), value)
+        ordered = sorted(first)
+        self.value_list = []
+        value_ids = {}
+        values = array('I')
+        for key in ordered:
+            value = first[key]
+            vid = value_ids.get(value)
+            if vid is None:
+                vid = value_ids[value] = len(self.value_list)
+                self.value_list.append(value)
+            values.append(vid)
+        self.keys = array('Q', ordered)
+        self.values = values
+
+    @classmethod
+    def from_table(cls, table):
+        if isinstance(table, CompactHashTable):
+            return cls((packed - 1, table.value_list[vid]) for packed, vid in zip(table.keys, table.values)
+                       if packed != EMPTY_SLOT)
+        buckets = table.buckets()
+        if table.names is not None:
+            names = table.names.names
+            return cls((key, names[vid]) for bucket in buckets for key, vid in bucket or EMPTY_BUCKET)
+        return cls(entry for bucket in buckets for entry in bucket or EMPTY_BUCKET)
+
+    def prefix_range(self, prefix):
+        if not prefix.isdigit() or len(prefix) > CNP_DIGITS:
+            raise ValueError(f"Prefix invalid (se așteaptă 1-13 cifre): {prefix!r}")
+        scale = 10 ** (CNP_DIGITS - len(prefix))
+        low = int(prefix) * scale
+        return bisect.bisect_left(self.keys, low), bisect.bisect_left(self.keys, low + scale)
+
+    def count_prefix(self, prefix):
+        start, stop = self.prefix_range(prefix)
+        return stop - start
+
+    def search_prefix(self, prefix, limit=10, offset=0):
+        # (numărul total de potriviri, pagina [offset, offset + limit) de (CNP, nume))
+        start, stop = self.prefix_range(prefix)
+        page_start = min(start + offset, stop)
+        page_stop = stop if limit is None else min(page_start + limit, stop)
+        page = [(f"{self.keys[i]:013d}", self.value_list[self.values[i]]) for i in range(page_start, page_stop)]
+        return stop - start, page
+
+    def __len__(self):
+        return len(self.keys)
+
+    def memory_usage(self):
+
+        return self.keys.itemsize * len(self.keys) + self.values.itemsize * len(self.values)
+
+
+def random_searches(hash_table, csv_filename="cnp_data.csv", searches=1000, selected=None):
+
+    if selected is None:
+        selected = sample_keys(csv_filename, searches)
+
+    if hasattr(hash_table, "search_many"):
+        _, found, iterations = hash_table.search_many(selected)
+    else:
+        found, iterations = [], []
+        for cnp in selected:
+            value, count = hash_table.search(cnp)
+            found.append(value is not None)
+            iterations.append(count)
+    summary = search_summary(found, iterations)
+
     print("\n--- Statistici Căutări ---")
-    print(f"Căutări efectuate: {searches}")
-    print(f"Număr total de iterații: {total_iterations}")
-    print(f"Număr mediu de iterații pe căutare: {average_iterations:.2f}")
+    print(f"Căutări efectuate: {summary['searches']}")
+    print(f"Număr total de iterații: {summary['total_iterations']}")
+    print(f"Număr mediu de iterații pe căutare: {summary['mean_iterations']:.2f}")
+    return summary
 
 
 
 def main():
     csv_filename = "cnp_data.csv"
+    index_filename = "cnp_data.idx"
     total_records = 1_000_000
 
 
@@ -146,10 +1767,16 @@ def main():
         print(f"Fișierul {csv_filename} există deja. Se va folosi fișierul existent.")
 
 
-    ht = populate_hash_table(csv_filename)
+    selected = None
+    if not index_matches_source(index_filename, csv_filename):
+        if os.path.exists(index_filename):
+            print(f"Indexul {index_filename} nu corespunde fișierului {csv_filename}; se reconstruiește.")
+        table, selected, _ = stream_load(csv_filename, searches=1000, table_cls=CompactHashTable)
+        build_mmap_index(csv_filename, index_filename, table=table)
+    ht = MmapCNPIndex(index_filename)
 
 
-    random_searches(ht, csv_filename, searches=1000)
+    random_searches(ht, csv_filename, searches=1000, selected=selected)
 
 
 if __name__ == '__main__':